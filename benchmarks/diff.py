@@ -0,0 +1,109 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Time and peak memory to compare two large exports.
+
+Run with `python -m benchmarks.diff`.
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable, Iterator
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.diff import RUN_SIZE, diff
+from mafolex.reader import read_file
+from mafolex.wrapper import User
+from mafolex.writer import write_file
+
+from .users import make_users
+
+
+def churned(users: Iterator[User], churn: int) -> Iterator[User]:
+    """The same users a day later: one in `churn` unfollowed, changed their note, or is new."""
+    for i, user in enumerate(users):
+        match i % churn:
+            case 0:
+                continue
+            case 1:
+                user.note = "A new note"
+            case 2:
+                yield User(f"new{i}@elsewhere.social", "", "", "https://elsewhere.social/", False)
+            case _:
+                pass
+        yield user
+
+
+def in_memory(old: Path, new: Path) -> int:
+    """For comparison: both lists held in dictionaries, as a script would do it."""
+    before = {user[0]: user for user in read_file(old)}
+    after = {user[0]: user for user in read_file(new)}
+    changes = before.keys() ^ after.keys()
+    return len(changes) + sum(
+        1
+        for name in before.keys() & after.keys()
+        if before[name][2] != after[name][2] or before[name][4] != after[name][4]
+    )
+
+
+def streaming(old: Path, new: Path, run_size: int) -> int:
+    changes = diff(read_file(old), read_file(new), run_size)
+    return sum(1 for _ in changes)
+
+
+def measure(compare: Callable[[], int]) -> tuple[float, float, int]:
+    """The time taken and peak memory in MiB, and how many changes were found."""
+    start = time.perf_counter()
+    count = compare()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    compare()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time and peak memory to compare two exports.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--churn", type=int, default=50, help="One in this many rows changes")
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE)
+    args = parser.parse_args()
+    rows: int = args.rows
+    run_size: int = args.run_size
+
+    results = Table(
+        "Method", "Time (s)", "Peak memory (MiB)", "Changes", title=f"Diff of {rows:,} rows"
+    )
+    with TemporaryDirectory() as directory:
+        old, new = Path(directory, "old.csv"), Path(directory, "new.csv")
+        write_file(make_users(rows), old)
+        write_file(churned(make_users(rows), args.churn), new)
+
+        def read_only() -> int:
+            # The floor: parsing both files and nothing else.
+            deque(read_file(old), maxlen=0)
+            deque(read_file(new), maxlen=0)
+            return 0
+
+        for name, compare in (
+            ("Read both files", read_only),
+            ("Dictionaries", partial(in_memory, old, new)),
+            (f"Sorted merge, runs of {run_size:,}", partial(streaming, old, new, run_size)),
+        ):
+            seconds, peak, count = measure(compare)
+            results.add_row(name, f"{seconds:.2f}", f"{peak:.1f}", f"{count:,}")
+
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
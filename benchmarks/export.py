@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Export throughput for each output format.
+
+Run with `python -m benchmarks.export`.
+"""
+
+import argparse
+import csv
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.wrapper import UserTable
+from mafolex.writer import FIELDS, write_file
+
+from .users import make_users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export throughput for each output format.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    rows: int = args.rows
+
+    users = UserTable(make_users(rows))
+    results = Table(
+        "Output", "Time (s)", "Size (MiB)", "Throughput (MiB/s)", title=f"{rows:,} rows"
+    )
+
+    def add(name: str, path: Path, seconds: float) -> None:
+        size = path.stat().st_size / 2**20
+        results.add_row(name, f"{seconds:.2f}", f"{size:.1f}", f"{size / seconds:.1f}")
+
+    with TemporaryDirectory() as directory:
+        # For comparison: the csv module, as the writer used it before.
+        path = Path(directory, "reference.csv")
+        start = time.perf_counter()
+        with path.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_NOTNULL)
+            writer.writerow(FIELDS)
+            writer.writerows(users.rows())
+        add("csv module", path, time.perf_counter() - start)
+
+        # The floor: writing the same bytes with no formatting at all.
+        data = path.read_bytes()
+        path = Path(directory, "raw.csv")
+        start = time.perf_counter()
+        path.write_bytes(data)
+        add("Raw write", path, time.perf_counter() - start)
+
+        for name in "users.csv", "users.jsonl", "users.sqlite", "users.csv.gz", "users.jsonl.gz":
+            path = Path(directory, name)
+            start = time.perf_counter()
+            write_file(users, path)
+            add(name, path, time.perf_counter() - start)
+
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
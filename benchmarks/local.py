@@ -0,0 +1,264 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Per-row time and peak memory of everything between the server and the screen or file.
+
+Run with `python -m benchmarks.local`. Each case is compared with the baseline saved in
+`benchmarks/baselines/local.json`, and the run fails if any costs more per row than its baseline
+allows. Pass `--save` to replace the baselines with this run's results, after a deliberate change or
+on a new machine: the times only mean anything compared with the same machine's.
+
+Most of a full run goes on the Rich table at a million rows, which takes over an hour.
+Pass `--sizes 10000 100000` for a quicker check against the smaller baselines.
+
+The GUI cases run on Qt's offscreen platform, so no display is needed.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import NamedTuple, override
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.fancy import print_users
+from mafolex.gui.table import AccountTableModel
+from mafolex.wrapper import PAGE_SIZE, User, UserTable
+from mafolex.writer import write
+
+from .users import make_users
+
+BASELINES = Path(__file__).parent / "baselines" / "local.json"
+
+# How much slower or bigger than its baseline a case may be before it counts as a regression.
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.1
+
+# How many lookups the model cases make, whatever the size of the table.
+LOOKUPS = 200_000
+
+
+class _Account(NamedTuple):
+    """The fields of a mastodon.py `Account` that `User.from_api` reads."""
+
+    id: str
+    acct: str
+    display_name: str
+    url: str
+
+
+class _Relationship(NamedTuple):
+    note: str
+    following: bool
+    followed_by: bool
+
+
+class Result(NamedTuple):
+    seconds: float
+    peak: int
+
+
+def measure(run: Callable[[], object]) -> Result:
+    """Time `run`, then run it again to find the most memory it needed at once."""
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(seconds, peak)
+
+
+def users_from_api(rows: int) -> Callable[[], object]:
+    accounts = [
+        (
+            _Account(str(i), user.username, user.display_name, user.url),
+            _Relationship(user.note, user.mutual, user.mutual),
+        )
+        for i, user in enumerate(make_users(rows))
+    ]
+    return lambda: UserTable(User.from_api(*pair) for pair in accounts)
+
+
+def writer(rows: int) -> Callable[[], object]:
+    users = UserTable(make_users(rows))
+
+    def run() -> None:
+        # Nowhere to keep the output, so only the writer's own memory is counted.
+        with Path(os.devnull).open("w", encoding="utf-8", newline="") as f:
+            write(users, f)
+
+    return run
+
+
+class _Discard(io.StringIO):
+    @override
+    def write(self, s: str, /) -> int:
+        return len(s)
+
+
+def rich_table(rows: int) -> Callable[[], object]:
+    users = UserTable(make_users(rows))
+
+    def run() -> None:
+        # A file that forgets what's written to it, so only the table's own memory is counted.
+        console = Console(file=_Discard(), width=160, force_terminal=True)
+        print_users(console, users, "Followers", caption=lambda: "")
+
+    return run
+
+
+def _model(rows: int) -> AccountTableModel:
+    _ = QApplication.instance() or QApplication([])
+    model = AccountTableModel()
+    users = list(make_users(rows))
+    model.begin_refresh()
+    for start in range(0, rows, PAGE_SIZE):
+        model.merge(users[start : start + PAGE_SIZE])
+    model.end_refresh()
+    return model
+
+
+def model_fill(rows: int) -> Callable[[], object]:
+    return lambda: _model(rows)
+
+
+def model_data(rows: int) -> Callable[[], object]:
+    model = _model(rows)
+    columns = model.columnCount()
+    # Spread the lookups over the whole table, rather than the rows that happen to be cached.
+    indexes = [model.index(i * 7919 % rows, i % columns) for i in range(LOOKUPS)]
+    role = Qt.ItemDataRole.DisplayRole
+
+    def run() -> None:
+        for index in indexes:
+            model.data(index, role)
+
+    return run
+
+
+def model_header_data(rows: int) -> Callable[[], object]:
+    model = _model(rows)
+    columns = model.columnCount()
+    horizontal, vertical = Qt.Orientation.Horizontal, Qt.Orientation.Vertical
+    role = Qt.ItemDataRole.DisplayRole
+
+    def run() -> None:
+        # As the view asks for them while scrolling: a row number for each row, and the headers.
+        for i in range(LOOKUPS):
+            model.headerData(i * 7919 % rows, vertical, role)
+            model.headerData(i % columns, horizontal, role)
+
+    return run
+
+
+class Case(NamedTuple):
+    setup: Callable[[int], Callable[[], object]]
+    # Whether the cost grows with the number of rows, rather than a fixed number of lookups.
+    per_row: bool = True
+
+
+CASES = {
+    "User.from_api": Case(users_from_api),
+    "writer.write": Case(writer),
+    "Rich table": Case(rich_table),
+    "Model fill": Case(model_fill),
+    "Model data()": Case(model_data, per_row=False),
+    "Model headerData()": Case(model_header_data, per_row=False),
+}
+
+
+def run_cases(names: list[str], sizes: list[int]) -> Iterator[tuple[str, int, int, Result]]:
+    """Run each case at each size, yielding the name, size, units of work and result."""
+    for name in names:
+        case = CASES[name]
+        for size in sizes:
+            run = case.setup(size)
+            units = size if case.per_row else LOOKUPS
+            yield name, size, units, measure(run)
+            del run
+            gc.collect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-row time and memory of the local data path.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Rows"
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--save", action="store_true", help="Save the results as the baselines")
+    args = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    baselines: dict[str, dict[str, float]] = (
+        json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    )
+    results = Table(
+        "Case",
+        "Rows",
+        "Time (s)",
+        "Per unit (µs)",
+        "Baseline (µs)",
+        "Peak (MiB)",
+        "Per row (bytes)",
+        "Baseline (bytes)",
+        "",
+        title="Local data path",
+    )
+    regressions = 0
+    for name, size, units, result in run_cases(args.cases, args.sizes):
+        key = f"{name}/{size}"
+        micros = result.seconds * 1e6 / units
+        per_row = result.peak / size
+        baseline = baselines.get(key)
+        verdict = "[bright_black]new"
+        if baseline is not None:
+            slower = micros > baseline["micros"] * (1 + TIME_TOLERANCE)
+            # Small peaks are mostly noise, so they get a bit more slack.
+            bigger = per_row > baseline["bytes"] * (1 + MEMORY_TOLERANCE) + 64
+            problems = [word for word, bad in (("slower", slower), ("bigger", bigger)) if bad]
+            verdict = f"[red]{', '.join(problems)}" if problems else "[green]ok"
+            regressions += bool(problems)
+        if args.save:
+            baselines[key] = {"micros": round(micros, 3), "bytes": round(per_row, 1)}
+
+        results.add_row(
+            name,
+            f"{size:,}",
+            f"{result.seconds:.2f}",
+            f"{micros:.2f}",
+            f"{baseline['micros']:.2f}" if baseline else "-",
+            f"{result.peak / 2**20:.1f}",
+            f"{per_row:.0f}",
+            f"{baseline['bytes']:.0f}" if baseline else "-",
+            verdict,
+        )
+
+    console = Console()
+    console.print(results)
+    if args.save:
+        BASELINES.parent.mkdir(exist_ok=True)
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        console.print(f"Saved baselines to [b]{BASELINES}")
+    elif regressions:
+        console.print(f"[red]{regressions} regressions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
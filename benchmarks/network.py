@@ -0,0 +1,95 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""End-to-end fetch throughput, request counts and memory, against the mock server.
+
+Run with `python -m benchmarks.network`. The server runs in the same process, so its work is
+included in the times, and on a single core it competes with the client for it.
+
+Building mastodon.py's typed objects makes the default path slow, at around a dozen accounts a
+second, so by default it's only run on small lists. Pass `--fast` to read accounts straight from the
+JSON instead, which is quick enough for lists of up to a million followers, and compare the two.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.wrapper import Mastodon
+
+from .server import MockMastodon
+
+# The sizes run unless others are given, for each path.
+TYPED_SIZES = [100, 1000]
+FAST_SIZES = [1000, 10_000, 100_000, 1_000_000]
+
+
+def fetch(url: str, query: str, fast: bool) -> int:
+    # Any token will do.
+    api = Mastodon(instance_domain=url, access_token="benchmark", raw=fast)  # noqa: S106
+    users = api.get_followers() if query == "followers" else api.get_following()
+    return len(users)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end fetch throughput and request counts.")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Followers to fetch")
+    parser.add_argument(
+        "--fast", action="store_true", help="Read accounts straight from the JSON (mafolex --fast)"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per response")
+    parser.add_argument("--no-memory", action="store_true", help="Skip measuring peak memory")
+    args = parser.parse_args()
+    fast: bool = args.fast
+    sizes: list[int] = args.sizes or (FAST_SIZES if fast else TYPED_SIZES)
+    path = "raw JSON" if fast else "mastodon.py objects"
+
+    results = Table(
+        "List",
+        "Accounts",
+        "Time (s)",
+        "Accounts/s",
+        "Page requests",
+        "Relationship requests",
+        "Peak memory (MiB)",
+        title=f"Fetching from the mock server through {path}, {args.latency * 1000:.0f} ms latency",
+    )
+    for size in sizes:
+        # Following is a tenth the size, so only some followers are mutuals.
+        server = MockMastodon(followers=size, following=size // 10, latency=args.latency)
+        with server.running() as url:
+            for query in "followers", "following":
+                server.requests.clear()
+                start = time.perf_counter()
+                count = fetch(url, query, fast)
+                seconds = time.perf_counter() - start
+                pages = sum(n for path, n in server.requests.items() if path.endswith(query))
+                relationships = server.requests["/api/v1/accounts/relationships"]
+
+                peak = "-"
+                if not args.no_memory:
+                    tracemalloc.start()
+                    fetch(url, query, fast)
+                    _, traced = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    peak = f"{traced / 2**20:.1f}"
+
+                results.add_row(
+                    query,
+                    f"{count:,}",
+                    f"{seconds:.2f}",
+                    f"{count / seconds:,.0f}",
+                    f"{pages:,}",
+                    f"{relationships:,}",
+                    peak,
+                )
+
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""CPU cost per page of reading account lists through mastodon.py, and straight from the JSON.
+
+Run with `python -m benchmarks.rawjson`. Only the CPU time of the thread doing the fetching is
+counted, so the mock server running in the same process doesn't skew the comparison.
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from mastodon import Mastodon as MastodonAPI
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.raw import RawClient
+from mafolex.wrapper import PAGE_SIZE, pooled_session, user_agent
+
+from .server import MockMastodon
+
+TOKEN = "benchmark"  # noqa: S105 - any token will do
+
+
+def typed(url: str) -> Callable[[], int]:
+    """The current path: every page turned into mastodon.py `Account`s by `fetch_remaining`."""
+    api = MastodonAPI(api_base_url=url, access_token=TOKEN, session=pooled_session())
+
+    def run() -> int:
+        first = api.account_followers(0, limit=PAGE_SIZE)
+        return len(api.fetch_remaining(first))
+
+    return run
+
+
+def raw(url: str) -> Callable[[], int]:
+    api = RawClient(url, TOKEN, pooled_session(), user_agent=user_agent())
+
+    def run() -> int:
+        count = 0
+        page = api.account_followers(0, limit=PAGE_SIZE)
+        while page:
+            count += len(page)
+            page = api.fetch_next(page)
+        return count
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU cost per page of reading account lists.")
+    parser.add_argument("--followers", type=int, default=800)
+    args = parser.parse_args()
+    followers: int = args.followers
+    pages = -(-followers // PAGE_SIZE)
+
+    results = Table(
+        "Path",
+        "Accounts",
+        "CPU per page (ms)",
+        "Wall per page (ms)",
+        "Peak memory (MiB)",
+        title=f"Reading {followers:,} followers, {pages:,} pages",
+    )
+    server = MockMastodon(followers=followers, following=0)
+    with server.running() as url:
+        for name, setup in ("fetch_remaining (mastodon.py)", typed), ("Raw JSON", raw):
+            run = setup(url)
+            cpu, wall = time.thread_time(), time.perf_counter()
+            count = run()
+            cpu, wall = time.thread_time() - cpu, time.perf_counter() - wall
+
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.add_row(
+                name,
+                f"{count:,}",
+                f"{cpu * 1000 / pages:.2f}",
+                f"{wall * 1000 / pages:.2f}",
+                f"{peak / 2**20:.1f}",
+            )
+
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
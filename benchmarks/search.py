@@ -0,0 +1,75 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Search and sort latency of the account table.
+
+Run with `python -m benchmarks.search`. Set `QT_QPA_PLATFORM=offscreen` to run it headless.
+"""
+
+import argparse
+from functools import partial
+
+from PySide6.QtCore import Qt, QThreadPool
+from PySide6.QtWidgets import QApplication
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.gui.table import HEADERS, AccountFilterModel, AccountTableModel, AccountTableView
+from mafolex.wrapper import PAGE_SIZE
+
+from .table import timed
+from .users import make_users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search and sort latency of the account table.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    rows: int = args.rows
+
+    app = QApplication([])
+    users = list(make_users(rows))
+    model = AccountTableModel()
+    proxy = AccountFilterModel(model)
+    view = AccountTableView()
+    view.setModel(proxy)
+    view.resize(1280, 800)
+    view.show()
+
+    model.begin_refresh()
+    for start in range(0, rows, PAGE_SIZE):
+        model.merge(users[start : start + PAGE_SIZE])
+    model.end_refresh()
+    app.processEvents()
+
+    def build() -> None:
+        # The first search builds the index on another thread, and applies itself once it's done.
+        proxy.set_filter("user")
+        QThreadPool.globalInstance().waitForDone()
+        app.processEvents()
+
+    results = Table("Operation", "Time (ms)", title=f"Account table, {rows:,} rows")
+    results.add_row("Build index (off the UI thread)", f"{timed(build):.1f}")
+
+    typed = ""
+    for character in "user123":
+        typed += character
+        results.add_row(f"Type {typed!r}", f"{timed(partial(proxy.set_filter, typed)):.1f}")
+    results.add_row("Clear search", f"{timed(partial(proxy.set_filter, '')):.1f}")
+
+    for column, header in enumerate(HEADERS):
+        for order in Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder:
+            results.add_row(
+                f"Sort by {header}, {order.name.removesuffix('Order').lower()}",
+                f"{timed(partial(view.sortByColumn, column, order)):.1f}",
+            )
+    results.add_row(
+        "Search 'event' while sorted", f"{timed(partial(proxy.set_filter, 'event')):.1f}"
+    )
+
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""A local stand-in for the parts of the Mastodon API that mafolex uses.
+
+Run with `python -m benchmarks.server` to serve it until interrupted, then point mafolex at the URL
+it prints with any access token, for example through `mafolex batch`.
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, cast, override
+from urllib.parse import parse_qs, urlsplit
+
+from rich.console import Console
+
+# The most accounts Mastodon will return in one page.
+PAGE_SIZE = 80
+
+# High enough that benchmarks never wait for budget, unless they ask to.
+RATE_LIMIT = 1_000_000
+RATE_LIMIT_WINDOW = 300
+
+# How many distinct instances the synthetic accounts come from.
+DOMAINS = 3000
+
+_LIST = re.compile(r"/api/v1/accounts/(\d+)/(followers|following)")
+
+# What mastodon.py is told the server runs, when it checks which endpoints are available.
+VERSION = "4.3.0"
+
+
+def account(account_id: int, followers: int = 0, following: int = 0) -> dict[str, Any]:
+    """A synthetic account. Account 0 is the one logged in."""
+    domain = f"instance{account_id % DOMAINS}.social"
+    return {
+        "id": str(account_id),
+        "username": f"user{account_id}",
+        "acct": f"user{account_id}@{domain}" if account_id else "me",
+        "display_name": f"User number {account_id}",
+        "url": f"https://{domain}/@user{account_id}",
+        "note": "<p>A synthetic account</p>",
+        "avatar": f"https://{domain}/avatars/{account_id}.png",
+        "avatar_static": f"https://{domain}/avatars/{account_id}.png",
+        "header": f"https://{domain}/headers/{account_id}.png",
+        "header_static": f"https://{domain}/headers/{account_id}.png",
+        "locked": False,
+        "bot": False,
+        "group": False,
+        "discoverable": True,
+        "indexable": True,
+        "emojis": [],
+        "fields": [{"name": "Website", "value": f"https://{domain}/", "verified_at": None}],
+        "roles": [],
+        "followers_count": followers,
+        "following_count": following,
+        "statuses_count": account_id % 1000,
+        "created_at": "2026-01-01T00:00:00.000Z",
+        "last_status_at": "2026-10-01",
+    }
+
+
+class MockMastodon(ThreadingHTTPServer):
+    """A Mastodon server, for one account followed by and following synthetic accounts.
+
+    Accounts 1 to `followers` follow it, and it follows accounts 1 to `following`, so the smaller
+    list is all mutuals. Lists come newest first, the highest ID on the first page. Every response
+    is delayed by `latency` seconds, and counted against a rate limit shared by all clients.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        followers: int = 1000,
+        following: int = 1000,
+        latency: float = 0.0,
+        rate_limit: int = RATE_LIMIT,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.followers = followers
+        self.following = following
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.requests: Counter[str] = Counter()
+        self._remaining = rate_limit
+        self._reset = time.time() + RATE_LIMIT_WINDOW
+        self._lock = Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def count(self, endpoint: str) -> tuple[int, float]:
+        """Count a request against the rate limit, returning the budget left and when it resets."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            now = time.time()
+            if now >= self._reset:
+                self._remaining = self.rate_limit
+                self._reset = now + RATE_LIMIT_WINDOW
+            self._remaining -= 1
+            return self._remaining, self._reset
+
+    @contextmanager
+    def running(self) -> Iterator[str]:
+        """Serve requests on another thread, yielding the URL to send them to."""
+        thread = Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield self.url
+        finally:
+            self.shutdown()
+            thread.join()
+            self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse their connections.
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, body: object, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        server = cast("MockMastodon", self.server)
+        remaining, reset = server.count(urlsplit(self.path).path)
+        if remaining < 0:
+            body, status = {"error": "Too many requests"}, 429
+        data = json.dumps(body).encode()
+        time.sleep(server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-RateLimit-Limit", str(server.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(max(remaining, 0)))
+        self.send_header(
+            "X-RateLimit-Reset",
+            datetime.fromtimestamp(reset, UTC).isoformat(timespec="milliseconds"),
+        )
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _list(self, query: str, account_id: str, params: dict[str, list[str]]) -> None:
+        server = cast("MockMastodon", self.server)
+        total = server.followers if query == "followers" else server.following
+        limit = min(int(params.get("limit", [PAGE_SIZE])[0]), PAGE_SIZE)
+        first = min(int(params.get("max_id", [total + 1])[0]) - 1, total)
+        ids = range(first, max(first - limit, 0), -1)
+        headers = {}
+        if ids and ids[-1] > 1:
+            base = f"{server.url}/api/v1/accounts/{account_id}/{query}?limit={limit}"
+            headers["Link"] = (
+                f'<{base}&max_id={ids[-1]}>; rel="next", <{base}&min_id={ids[0]}>; rel="prev"'
+            )
+        self._send([account(i) for i in ids], headers=headers)
+
+    def _relationships(self, params: dict[str, list[str]]) -> None:
+        server = cast("MockMastodon", self.server)
+        self._send(
+            [
+                {
+                    "id": account_id,
+                    "following": int(account_id) <= server.following,
+                    "followed_by": int(account_id) <= server.followers,
+                    "note": "Met at a conference" if int(account_id) % 10 == 0 else "",
+                }
+                for account_id in params.get("id[]", [])
+            ]
+        )
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        server = cast("MockMastodon", self.server)
+        if url.path.rstrip("/") in ("/api/v1/instance", "/api/v2/instance"):
+            self._send({"uri": "localhost", "title": "Mock Mastodon", "version": VERSION})
+        elif url.path == "/api/v1/accounts/verify_credentials":
+            self._send(account(0, server.followers, server.following))
+        elif url.path == "/api/v1/accounts/relationships":
+            self._relationships(params)
+        elif match := _LIST.fullmatch(url.path):
+            self._list(match[2], match[1], params)
+        else:
+            self._send({"error": "Record not found"}, 404)
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A local stand-in for the Mastodon API.")
+    parser.add_argument("--followers", type=int, default=1000)
+    parser.add_argument("--following", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per response")
+    parser.add_argument("--rate-limit", type=int, default=RATE_LIMIT, help="Requests per window")
+    args = parser.parse_args()
+
+    server = MockMastodon(args.followers, args.following, args.latency, args.rate_limit)
+    Console().print(f"Serving on [b]{server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""How long the CLI takes to start, and whether it loads anything it shouldn't.
+
+Run with `python -m benchmarks.startup`. Each command is run in a fresh interpreter with
+`-X importtime`, and the run fails if importing mafolex takes longer than the budget, or if any of
+the modules that only commands should load are imported just to parse the command line.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from typing import NamedTuple
+
+from rich.console import Console
+from rich.table import Table
+
+# Commands that should never need more than the command line parser.
+COMMANDS = (["--help"], ["list", "--help"], ["diff", "--help"], ["login", "--help"])
+
+# The most time importing mafolex itself may take, not counting what Python imports at startup.
+BUDGET_MS = 150.0
+
+# Modules that are slow to import, and only needed once a command actually runs.
+HEAVY = ("mastodon", "requests", "keyring", "importlib.metadata", "PySide6")
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)")
+
+
+class Startup(NamedTuple):
+    seconds: float
+    # Cumulative import time of each module imported, in microseconds.
+    imports: dict[str, int]
+
+
+def run(command: list[str]) -> Startup:
+    start = time.perf_counter()
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-m", "mafolex", *command],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds = time.perf_counter() - start
+    imports: dict[str, int] = {}
+    for match in _LINE.finditer(result.stderr):
+        cumulative, name = match.groups()
+        imports[name] = int(cumulative)
+    return Startup(seconds, imports)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup time of the CLI.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each command")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="Milliseconds")
+    args = parser.parse_args()
+    budget: float = args.budget
+
+    results = Table(
+        "Command", "Wall time (ms)", "Importing mafolex (ms)", "Heavy modules", "", title="Startup"
+    )
+    failures = 0
+    for command in COMMANDS:
+        # The fastest run is the one least disturbed by everything else on the machine.
+        runs = [run(command) for _ in range(args.repeat)]
+        fastest = min(runs, key=lambda startup: startup.seconds)
+        mafolex = min(startup.imports.get("mafolex.cli", 0) for startup in runs) / 1000
+        heavy = sorted(
+            {name for name in fastest.imports for prefix in HEAVY if name.startswith(prefix)}
+        )
+        ok = mafolex <= budget and not heavy
+        failures += not ok
+        results.add_row(
+            f"mafolex {' '.join(command)}",
+            f"{fastest.seconds * 1000:.0f}",
+            f"{mafolex:.1f}",
+            ", ".join(heavy) or "-",
+            "[green]ok" if ok else "[red]over budget" if not heavy else "[red]too heavy",
+        )
+
+    console = Console()
+    console.print(results)
+    if failures:
+        console.print(f"[red]{failures} commands start too slowly (budget {budget:.0f} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Paint and scroll cost of the account table.
+
+Run with `python -m benchmarks.table`. Set `QT_QPA_PLATFORM=offscreen` to run it headless.
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.gui.table import AccountTableModel, AccountTableView
+from mafolex.wrapper import PAGE_SIZE
+
+from .users import make_users
+
+
+def timed(func: Callable[[], object], repeat: int = 1) -> float:
+    """Return the mean wall time of `func` over `repeat` calls, in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Paint and scroll cost of the account table.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+    rows: int = args.rows
+    frames: int = args.frames
+
+    app = QApplication([])
+    users = list(make_users(rows))
+    model = AccountTableModel()
+    view = AccountTableView()
+    view.setModel(model)
+    view.resize(1280, 800)
+    view.show()
+    app.processEvents()
+
+    def fill() -> None:
+        model.begin_refresh()
+        for start in range(0, rows, PAGE_SIZE):
+            model.merge(users[start : start + PAGE_SIZE])
+        model.end_refresh()
+
+    results = Table("Operation", "Time (ms)", title=f"Account table, {rows:,} rows")
+    results.add_row("Fill in pages", f"{timed(fill):.1f}")
+    app.processEvents()
+
+    # Spread the lookups over the whole table, rather than the rows that happen to be cached.
+    columns = model.columnCount()
+    indexes = [model.index(i * 7919 % rows, i % columns) for i in range(100_000)]
+
+    def lookup() -> None:
+        for index in indexes:
+            model.data(index, Qt.ItemDataRole.DisplayRole)
+
+    results.add_row("100k data() calls", f"{timed(lookup):.1f}")
+    results.add_row("Paint viewport", f"{timed(view.viewport().grab, repeat=20):.2f}")
+
+    scrollbar = view.verticalScrollBar()
+    step = max(1, scrollbar.maximum() // frames)
+
+    def scroll() -> None:
+        for value in range(0, scrollbar.maximum(), step):
+            scrollbar.setValue(value)
+            view.viewport().grab()
+
+    results.add_row("Scroll, per frame", f"{timed(scroll) / frames:.2f}")
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Memory needed to hold a large list of users.
+
+Run with `python -m benchmarks.users`.
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable, Iterator
+
+from rich.console import Console
+from rich.table import Table
+
+from mafolex.wrapper import User, UserTable
+
+# Roughly how many distinct instances a large account's followers come from.
+DOMAINS = 3000
+
+
+def make_users(n: int) -> Iterator[User]:
+    """Users as they'd arrive from the server, with every string freshly allocated."""
+    for i in range(n):
+        domain = f"instance{i % DOMAINS}.social"
+        yield User(
+            username=f"user{i}@{domain}",
+            display_name=f"User number {i}",
+            # Most accounts have no note, but searches should find the few that do.
+            note=f"Met at event {i % 13}" if i % 5 == 0 else "",
+            url=f"https://{domain}/@user{i}",
+            mutual=i % 3 == 0,
+        )
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Return how many bytes the result of `build` holds on to."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory needed to hold a large list of users.")
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+    rows: int = args.rows
+
+    results = Table("Container", "Total (MiB)", "Per user (bytes)", title=f"{rows:,} users")
+    for name, build in (
+        ("list[User]", lambda: list(make_users(rows))),
+        ("UserTable", lambda: UserTable(make_users(rows))),
+    ):
+        size = measure(build)
+        results.add_row(name, f"{size / 2**20:.1f}", f"{size / rows:.0f}")
+    Console().print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,6 @@
 
 from sys import argv
 
-from rich import print  # noqa: A004
-
 if __name__ == "__main__":
     if len(argv) > 1:
         from .cli import app
@@ -13,6 +11,8 @@ if __name__ == "__main__":
         app()
 
     else:
+        from rich import print  # noqa: A004
+
         print(
             "Opening mafolex in GUI mode.",
             "To learn about CLI mode, use the --help flag.",
@@ -0,0 +1,106 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
+from typing import TYPE_CHECKING, ParamSpec, Self, TypeVar
+
+from .wrapper import RELATIONSHIPS_BATCH_SIZE, Mastodon, User
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+    from types import TracebackType
+
+# How many relationship lookups may be in flight at once.
+DEFAULT_CONCURRENCY = 32
+
+# Threads kept for following the pagination cursor: one each for followers and following.
+PAGINATION_THREADS = 2
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class AsyncMastodon:
+    """An asyncio counterpart to `Mastodon`, for use with `asyncio.run` or an event loop like Qt's.
+
+    Mastodon.py only speaks blocking HTTP, so requests run on thread pools of their own.
+    Relationship lookups for each page are started as soon as the page arrives and run alongside
+    pagination, with a semaphore bounding how many are in flight. Pages are fetched on threads of
+    their own, outside the semaphore, so they never queue behind lookups. Every request still goes
+    through the wrapped client's rate limit scheduler, which serves pages first when budget is
+    short, so concurrency never costs more than the budget allows.
+    """
+
+    def __init__(self, api: Mastodon | None = None, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.api = api or Mastodon(connections=concurrency + PAGINATION_THREADS)
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="mafolex-async")
+        self._pager = ThreadPoolExecutor(PAGINATION_THREADS, thread_name_prefix="mafolex-pages")
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: "TracebackType | None",
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pager.shutdown(wait=False, cancel_futures=True)
+
+    async def _page(self, f: "Callable[P, T]", *args: P.args, **kwargs: P.kwargs) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pager, lambda: f(*args, **kwargs)
+        )
+
+    async def _run(self, f: "Callable[P, T]", *args: P.args, **kwargs: P.kwargs) -> T:
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, lambda: f(*args, **kwargs)
+            )
+
+    async def get_current_user(self) -> str:
+        return await self._page(self.api.get_current_user)
+
+    async def _iter(self, query: str) -> "AsyncIterator[User]":
+        pending: deque[asyncio.Task[list[User]]] = deque()
+        try:
+            others = None
+            if not self.api.notes:
+                other = "following" if query == "followers" else "followers"
+                others = await self._page(self.api.account_ids, other)
+            cursor = None
+            while True:
+                accounts, cursor = await self._page(self.api.fetch_page, query, cursor)
+                pending.extend(
+                    asyncio.ensure_future(self._run(self.api.resolve, chunk, others))
+                    for chunk in batched(accounts, RELATIONSHIPS_BATCH_SIZE, strict=False)
+                )
+                # Hand over whatever is already finished, in order. If too much is still waiting,
+                # hold off on pagination until it catches up.
+                while pending and (pending[0].done() or len(pending) > self.concurrency):
+                    for user in await pending.popleft():
+                        yield user
+                if cursor is None or not accounts:
+                    break
+            while pending:
+                for user in await pending.popleft():
+                    yield user
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_followers(self) -> "AsyncIterator[User]":
+        return self._iter("followers")
+
+    def get_following(self) -> "AsyncIterator[User]":
+        return self._iter("following")
@@ -0,0 +1,195 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar, cast
+from urllib.parse import urlsplit
+
+from keyring.errors import KeyringError
+from mastodon import MastodonError
+
+from .wrapper import Mastodon, pooled_session
+from .writer import check_path, write_file
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from requests import Session
+
+    from .wrapper import User
+
+QUERIES = ("followers", "following")
+
+# How many instances we export from at once, unless the config says otherwise.
+DEFAULT_PARALLEL = 4
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class BatchAccount:
+    instance: str
+    # `None` to use the token saved in the keyring by `mafolex login`.
+    access_token: str | None
+    queries: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class BatchConfig:
+    accounts: tuple[BatchAccount, ...]
+    output_dir: Path
+    extension: str
+    parallel: int
+
+
+class BatchResult(NamedTuple):
+    account: str
+    query: str
+    path: Path | None
+    rows: int
+    error: Exception | None = None
+
+
+def _field(table: dict[str, Any], name: str, kind: type[T], default: T) -> T:
+    value = table.get(name, default)
+    if not isinstance(value, kind):
+        msg = f"`{name}` should be a {kind.__name__}, not {value!r}"
+        raise ValueError(msg)  # noqa: TRY004
+    return value
+
+
+def _account(table: object) -> BatchAccount:
+    if not isinstance(table, dict):
+        msg = f"Accounts should be tables, not {table!r}"
+        raise ValueError(msg)  # noqa: TRY004
+    table = cast("dict[str, Any]", table)
+    instance = _field(table, "instance", str, "")
+    if not instance:
+        msg = "Every account needs an `instance`"
+        raise ValueError(msg)
+    token = _field(table, "access_token", str, "")
+    queries = table.get("query", "followers")
+    queries = (queries,) if isinstance(queries, str) else tuple(queries)
+    for query in queries:
+        if query not in QUERIES:
+            msg = f"`query` should be followers or following, not {query!r}"
+            raise ValueError(msg)
+    return BatchAccount(instance, token or None, queries)
+
+
+def load_config(path: Path) -> BatchConfig:
+    """Read a batch export config from a TOML file.
+
+    It lists `[[accounts]]`, each with an `instance`, and optionally an `access_token` and a
+    `query` of `"followers"` (the default), `"following"` or both. Top-level keys give the
+    `output_dir` (relative to the config file, and the file's own directory by default), the
+    `format` as a file extension (`".csv"` by default), and how many instances to export from in
+    `parallel`.
+
+    Raises:
+        OSError: The file couldn't be read.
+        ValueError: The file isn't a valid config.
+    """
+    with path.open("rb") as f:
+        config = tomllib.load(f)
+    accounts = tuple(_account(table) for table in _field(config, "accounts", list, []))
+    if not accounts:
+        msg = "There are no `[[accounts]]` to export"
+        raise ValueError(msg)
+    extension = _field(config, "format", str, ".csv")
+    extension = extension if extension.startswith(".") else f".{extension}"
+    check_path(Path(f"export{extension}"))
+    parallel = _field(config, "parallel", int, DEFAULT_PARALLEL)
+    if parallel < 1:
+        msg = "`parallel` should be at least 1"
+        raise ValueError(msg)
+    return BatchConfig(
+        accounts,
+        path.parent / _field(config, "output_dir", str, "."),
+        extension,
+        parallel,
+    )
+
+
+def _host(instance: str) -> str:
+    # Instances may be given as a URL rather than a domain, but only the domain goes in file names.
+    return urlsplit(instance if "://" in instance else f"//{instance}").hostname or instance
+
+
+def _counted(users: "Iterator[User]", seen: list[int]) -> "Iterator[User]":
+    # Counts into a list, as the count is wanted even if the export fails partway.
+    for count, user in enumerate(users, 1):
+        seen[0] = count
+        yield user
+
+
+def _export_instance(
+    config: BatchConfig,
+    accounts: "list[BatchAccount]",
+    done: "Callable[[BatchResult], None]",
+) -> list[BatchResult]:
+    # Accounts on the same instance take turns, sharing a pool of connections to it. Each has its
+    # own rate limit budget, since Mastodon counts requests per account.
+    results: list[BatchResult] = []
+    with pooled_session() as session:
+        for account in accounts:
+            results.extend(_export_account(config, account, session, done))
+    return results
+
+
+def _export_account(
+    config: BatchConfig,
+    account: BatchAccount,
+    session: "Session",
+    done: "Callable[[BatchResult], None]",
+) -> "Iterator[BatchResult]":
+    api = Mastodon(
+        instance_domain=account.instance, access_token=account.access_token, session=session
+    )
+    name = account.instance
+    for query in account.queries:
+        seen = [0]
+        path = None
+        try:
+            name = api.get_current_user()
+            username = name.removeprefix("@").partition("@")[0]
+            file_name = f"{_host(account.instance)}_{username}_{query}{config.extension}"
+            path = config.output_dir / file_name
+            users = api.iter_followers() if query == "followers" else api.iter_following()
+            write_file(_counted(users, seen), path)
+        except (MastodonError, KeyringError, OSError) as e:
+            # Don't leave half an export lying around to be mistaken for the whole thing.
+            if path is not None:
+                path.unlink(missing_ok=True)
+            result = BatchResult(name, query, None, seen[0], e)
+        else:
+            result = BatchResult(name, query, path, seen[0])
+        done(result)
+        yield result
+
+
+def run_batch(
+    config: BatchConfig, done: "Callable[[BatchResult], None]" = lambda _: None
+) -> list[BatchResult]:
+    """Export every account in the config, one file for each of their lists.
+
+    Instances are exported from in parallel, so a slow one doesn't hold up the rest. A failed
+    export is recorded in its result, and doesn't stop the others. `done` is called from a worker
+    thread as each export finishes.
+    """
+    config.output_dir.mkdir(parents=True, exist_ok=True)
+    instance = attrgetter("instance")
+    by_instance = [
+        list(accounts) for _, accounts in groupby(sorted(config.accounts, key=instance), instance)
+    ]
+    with ThreadPoolExecutor(min(config.parallel, len(by_instance))) as executor:
+        futures = [
+            executor.submit(_export_instance, config, accounts, done) for accounts in by_instance
+        ]
+    return [result for future in futures for result in future.result()]
@@ -0,0 +1,75 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+from hashlib import sha256
+from typing import TYPE_CHECKING, NamedTuple
+
+from .paths import cache_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from pathlib import Path
+
+    from .snapshot import SnapshotKey, UserFields
+
+
+class CheckpointState(NamedTuple):
+    # Where to carry on paginating from, or `None` if every page has been fetched.
+    cursor: str | None
+    # How many bytes of the rows file belong to completed pages.
+    offset: int
+
+
+class Checkpoint:
+    """How far an export has got, saved after every page so that it can be resumed later.
+
+    The accounts fetched so far are appended to a JSON Lines file. Once they're written, a small
+    state file is replaced with the pagination cursor for the next page and the length of the rows
+    file at that point, so anything written after the last completed page is discarded on resume.
+    """
+
+    def __init__(self, key: "SnapshotKey", directory: "Path | None" = None) -> None:
+        directory = directory or cache_dir() / "checkpoints"
+        directory.mkdir(parents=True, exist_ok=True)
+        name = sha256("\0".join(key).encode()).hexdigest()[:16]
+        self._state_path = directory / f"{name}.json"
+        self._rows_path = directory / f"{name}.jsonl"
+
+    def load(self) -> CheckpointState | None:
+        try:
+            state = json.loads(self._state_path.read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+        return CheckpointState(state["cursor"], state["offset"])
+
+    def rows(self, state: CheckpointState) -> "Iterator[tuple[str, UserFields]]":
+        """The accounts saved with the given state, as `(id, fields)`."""
+        with self._rows_path.open("r+b") as f:
+            f.truncate(state.offset)
+            for line in f:
+                account_id, username, display_name, note, url, mutual = json.loads(line)
+                yield account_id, (username, display_name, note, url, mutual)
+
+    def start(self) -> None:
+        """Start again from the first page.
+
+        Rows can be left behind without a state, by a crash before the first state was written or
+        partway through `clear`. They'd fall inside the next state's offset, so they're discarded.
+        """
+        self._rows_path.unlink(missing_ok=True)
+
+    def save(self, cursor: str | None, rows: "Sequence[tuple[str, UserFields]]") -> None:
+        with self._rows_path.open("ab") as f:
+            f.writelines(
+                json.dumps([account_id, *fields]).encode() + b"\n" for account_id, fields in rows
+            )
+            offset = f.tell()
+        tmp_path = self._state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"cursor": cursor, "offset": offset}), "utf-8")
+        tmp_path.replace(self._state_path)
+
+    def clear(self) -> None:
+        self._state_path.unlink(missing_ok=True)
+        self._rows_path.unlink(missing_ok=True)
@@ -2,27 +2,39 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+# Only what's needed to parse the command line is imported up front. Each command imports the rest
+# when it runs, so that `--help` and shell completion don't wait for mastodon.py, requests and
+# keyring to load, and nothing here ever loads PySide6.
+
 import functools
 import sys
-from collections.abc import Callable
-from dataclasses import astuple, fields
+from collections.abc import Callable, Iterable
+from contextlib import closing
+from datetime import timedelta
 from enum import StrEnum, auto
-from io import StringIO
 from pathlib import Path
 from sys import exit as sys_exit
-from typing import Annotated, ParamSpec, TypeVar
+from typing import TYPE_CHECKING, Annotated, ParamSpec, TypeVar
 
-from mastodon import MastodonIllegalArgumentError, MastodonNetworkError
 from rich import print  # noqa: A004
+from rich.console import Console
 from rich.prompt import Prompt
 from rich.table import Table
 from typer import Argument, Option, Typer
 
-from .wrapper import Mastodon, User
-from .writer import write
+from . import trace
+from .snapshot import DEFAULT_TTL, SnapshotCache
+
+if TYPE_CHECKING:
+    from .batch import BatchResult
+    from .snapshot import UserFields
+    from .trace import Tracer
+    from .wrapper import Mastodon, User
 
 app = Typer()
-api = Mastodon()
+
+DEFAULT_CACHE_TTL_HOURS = DEFAULT_TTL / timedelta(hours=1)
+DEFAULT_TRACE_FILE = Path("mafolex-trace.json")
 
 
 class QueryMode(StrEnum):
@@ -37,7 +49,17 @@ class OutputMode(StrEnum):
 
 
 def error(msg: str, e: Exception, hint: str | None = None) -> None:
-    print(f"[red b]{msg} [/red b]{f'[b]{hint}[/b] ' if hint else ''}[i bright_black]{e.args[0]}")
+    # The first argument of an OSError is its error number, while its message says what went wrong.
+    detail = str(e) if isinstance(e, OSError) else e.args[0]
+    print(f"[red b]{msg} [/red b]{f'[b]{hint}[/b] ' if hint else ''}[i bright_black]{detail}")
+
+
+@functools.cache
+def get_api() -> "Mastodon":
+    """The wrapper every command shares, logged in as whoever the keyring says."""
+    from .wrapper import Mastodon
+
+    return Mastodon()
 
 
 P = ParamSpec("P")
@@ -47,6 +69,8 @@ T = TypeVar("T")
 def handle_mastodon(f: Callable[P, T]) -> Callable[P, T]:
     @functools.wraps(f)
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        from mastodon import MastodonNetworkError
+
         try:
             return f(*args, **kwargs)
         except MastodonNetworkError as e:
@@ -60,7 +84,7 @@ def handle_mastodon(f: Callable[P, T]) -> Callable[P, T]:
     return wrapper
 
 
-@app.command()
+@app.command("login")
 @handle_mastodon
 def command_login(
     instance_domain: Annotated[str, Argument(help="The domain name of the instance to log in to")],
@@ -68,6 +92,9 @@ def command_login(
         bool, Option("--force", "-f", help="Log from scratch, whether already logged in or not")
     ] = False,
 ) -> int:
+    from mastodon import MastodonIllegalArgumentError
+
+    api = get_api()
     api.instance_domain = instance_domain
     if force or not api.authed:
         url = api.get_auth_url()
@@ -88,9 +115,61 @@ def command_login(
     return 0
 
 
+def print_table(
+    query: QueryMode, data: Iterable["User"], header: bool, output: Path | None, paged: bool
+) -> None:
+    from .fancy import pager, print_users
+
+    api = get_api()
+    title = f"{query.value.capitalize()} for user [b]{api.get_current_user()}"
+
+    def caption() -> str:
+        return f"Batching relationship lookups saved {api.requests_saved} requests"
+
+    if output is not None:
+        with output.open("w", encoding="utf-8", newline="") as f:
+            print_users(Console(file=f), data, title, header, caption)
+    elif paged:
+        with pager() as console:
+            print_users(console, data, title, header, caption)
+    else:
+        print_users(Console(), data, title, header, caption)
+
+
+def print_profile(tracer: "Tracer", trace_file: Path) -> None:
+    """Write the trace to a file, and a summary of it to standard error."""
+    tracer.write_chrome_trace(trace_file)
+    table = Table(
+        "Stage",
+        "Endpoint or step",
+        "Calls",
+        "Total (s)",
+        "Mean (ms)",
+        "Longest (ms)",
+        "Latency (s)",
+        "Received (MiB)",
+        "Rate limit wait (s)",
+        title="Where the time went",
+        caption=f"Times add up across threads. Trace written to [b]{trace_file}",
+    )
+    for row in tracer.summary():
+        table.add_row(
+            row.stage,
+            row.name,
+            str(row.calls),
+            f"{row.seconds:.2f}",
+            f"{row.seconds * 1000 / row.calls:.1f}",
+            f"{row.longest * 1000:.1f}",
+            f"{row.latency:.2f}" if row.latency else "",
+            f"{row.bytes / 2**20:.2f}" if row.bytes else "",
+            f"{row.waited:.2f}" if row.waited else "",
+        )
+    Console(stderr=True).print(table)
+
+
 @app.command("list")
 @handle_mastodon
-def command_list(
+def command_list(  # noqa: PLR0913, PLR0917
     query: Annotated[
         QueryMode,
         Argument(
@@ -103,38 +182,254 @@ def command_list(
         Option("--mode", "-m", help="Output an ASCII table [b](fancy)[/b] or a CSV [b](csv)[/b]"),
     ] = OutputMode.auto,
     no_header: Annotated[bool, Option("--no-header", "-H", help="Remove the header line")] = False,
-    output: Annotated[Path | None, Option("--output", "-o", help="Output to a file")] = None,
+    output: Annotated[
+        Path | None,
+        Option(
+            "--output",
+            "-o",
+            help="Output to a file. In csv mode, the extension picks the format: .csv, .jsonl, "
+            ".sqlite or .db, with .gz or .zst added to compress it",
+        ),
+    ] = None,
+    cache: Annotated[
+        bool,
+        Option("--cache", "-c", help="Keep a local snapshot, and only fetch what changed since"),
+    ] = False,
+    cache_ttl: Annotated[
+        float,
+        Option(help="Hours before notes and mutual status in the snapshot are checked again"),
+    ] = DEFAULT_CACHE_TTL_HOURS,
+    resume: Annotated[
+        bool,
+        Option(
+            "--resume",
+            "-r",
+            help="Save progress after every page, and carry on from an interrupted export",
+        ),
+    ] = False,
+    paged: Annotated[
+        bool,
+        Option("--pager", "-p", help="Show the ASCII table in a pager ($PAGER, or less)"),
+    ] = False,
+    profile: Annotated[
+        bool,
+        Option(
+            "--profile",
+            help="Trace every request and step, and show where the time went on standard error",
+        ),
+    ] = False,
+    trace_file: Annotated[
+        Path, Option(help="Where [b]--profile[/b] writes a Chrome trace of the export")
+    ] = DEFAULT_TRACE_FILE,
+    progress: Annotated[
+        bool,
+        Option(help="Show progress on standard error, unless the output is going there too"),
+    ] = True,
+    fast: Annotated[
+        bool,
+        Option(
+            "--fast",
+            help="Read accounts straight from the server's JSON, skipping mastodon.py's "
+            "typed objects. Much faster on large lists",
+        ),
+    ] = False,
+    notes: Annotated[
+        bool,
+        Option(
+            help="Look up your note on each account. Without notes, mutuals come from comparing "
+            "followers with following, which takes far fewer requests",
+        ),
+    ] = True,
+) -> None:
+    api = get_api()
+    api.raw = fast
+    api.notes = notes
+    args = (query, mode, no_header, output, cache, cache_ttl, resume, paged, progress)
+    if not profile:
+        export(*args)
+        return
+    with trace.tracing() as tracer:
+        try:
+            export(*args)
+        finally:
+            print_profile(tracer, trace_file)
+
+
+def export(  # noqa: PLR0913, PLR0917
+    query: QueryMode,
+    mode: OutputMode,
+    no_header: bool,
+    output: Path | None,
+    cache: bool,
+    cache_ttl: float,
+    resume: bool,
+    paged: bool,
+    progress: bool,
 ) -> None:
+    from .progress import ExportProgress
+    from .wrapper import PAGE_SIZE
+    from .writer import check_path, write, write_file
+
+    api = get_api()
+    if cache:
+        api.cache = SnapshotCache(ttl=timedelta(hours=cache_ttl))
+    api.resumable = resume
+
     header = not no_header
     interactive = sys.stdout.isatty() and output is None
     if mode == OutputMode.auto:
         mode = OutputMode.fancy if interactive else OutputMode.csv
+    if mode == OutputMode.csv and output is not None:
+        try:
+            check_path(output)
+        except ValueError as e:
+            error("Can't write that file!", e)
+            sys_exit(1)
 
-    data = api.get_followers() if query is QueryMode.followers else api.get_following()
+    data = api.iter_followers() if query is QueryMode.followers else api.iter_following()
+    # The table would be drawn over by the progress display, if they shared the terminal.
+    if progress and sys.stderr.isatty() and (mode == OutputMode.csv or output is not None):
+        data = ExportProgress(
+            api.scheduler,
+            api.reported_count(query.value),
+            f"Fetching {query.value}",
+        ).track(data)
 
-    if mode == OutputMode.fancy:
-        table = Table(
-            title=f"{query.value.capitalize()} for user [b]{api.get_current_user()}",
-            show_header=header,
-        )
-        for field in fields(User):
-            table.add_column(field.metadata["display"])
-        for follower in data:
-            cells: list[str] = []
-            for field in astuple(follower):
-                if isinstance(field, bool):
-                    cells.append("[green]yes" if field else "[red]no")
-                else:
-                    cells.append(str(field))
-            table.add_row(*cells)
-        buffer = StringIO()
-        print(table, file=buffer)
+    # Closing the stream stops the fetch, if we finish early because the pager was closed.
+    with closing(data):
+        if mode == OutputMode.fancy:
+            print_table(query, data, header, output, paged)
+
+        elif output is not None:
+            write_file(data, output, header)
+
+        else:
+            # Rows are written a page at a time, as they arrive. The CSV writer emits its own line
+            # endings, so we can't let the standard output stream translate them.
+            sys.stdout.flush()
+            with open(sys.stdout.fileno(), "w", encoding="utf-8", newline="", closefd=False) as f:
+                write(data, f, header, chunk_size=PAGE_SIZE)
 
+
+@app.command("diff")
+@handle_mastodon
+def command_diff(  # noqa: PLR0913, PLR0917
+    old: Annotated[
+        Path | None,
+        Argument(
+            help="An earlier export. Leave it out to use the snapshot kept by [b]list --cache[/b]",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    new: Annotated[
+        Path | None,
+        Argument(
+            help="A later export. Leave it out to compare against the list as it is now",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    query: Annotated[
+        QueryMode,
+        Option("--query", "-q", help="Which list to fetch, when comparing against it as it is now"),
+    ] = QueryMode.followers,
+    mode: Annotated[
+        OutputMode,
+        Option("--mode", "-m", help="Output an ASCII table [b](fancy)[/b] or a CSV [b](csv)[/b]"),
+    ] = OutputMode.auto,
+    no_header: Annotated[bool, Option("--no-header", "-H", help="Remove the header line")] = False,
+    paged: Annotated[
+        bool,
+        Option("--pager", "-p", help="Show the ASCII table in a pager ($PAGER, or less)"),
+    ] = False,
+) -> None:
+    """Show who followed, unfollowed, or changed their note or mutual status between two lists."""
+    from .diff import diff
+    from .fancy import pager, print_changes
+    from .reader import read_file
+    from .writer import write_changes
+
+    api = get_api()
+    header = not no_header
+    if mode == OutputMode.auto:
+        mode = OutputMode.fancy if sys.stdout.isatty() else OutputMode.csv
+
+    old_users: Iterable[UserFields]
+    if old is not None:
+        old_users = read_file(old)
+        title = f"Changes since [b]{old.name}"
     else:
-        buffer = StringIO(newline="")
-        write(data, buffer, header)
+        # Syncing the snapshot afterwards means the next comparison starts from now.
+        api.cache = SnapshotCache()
+        try:
+            old_users = api.snapshot(query.value)
+        except LookupError as e:
+            error("Nothing to compare to!", e, "Run [b]mafolex list --cache[/b] first.")
+            sys_exit(1)
+        title = f"Changes to {query.value} since the last sync"
 
-    if output is not None:
-        output.write_text(buffer.getvalue(), "utf-8", newline="")
+    live = None
+    if new is not None:
+        new_users = read_file(new)
+        title += f" in [b]{new.name}"
+    else:
+        live = api.iter_followers() if query is QueryMode.followers else api.iter_following()
+        new_users = (user.as_tuple() for user in live)
+        title += f" for user [b]{api.get_current_user()}"
+
+    try:
+        changes = diff(old_users, new_users)
+    except ValueError as e:
+        error("Can't read that file!", e)
+        sys_exit(1)
+    finally:
+        if live is not None:
+            live.close()
+
+    if mode == OutputMode.csv:
+        sys.stdout.flush()
+        with open(sys.stdout.fileno(), "w", encoding="utf-8", newline="", closefd=False) as f:
+            write_changes(changes, f, header)
+    elif paged:
+        with pager() as console:
+            print_changes(console, changes, title, header)
     else:
-        print(buffer.getvalue())
+        print_changes(Console(), changes, title, header)
+
+
+@app.command("batch")
+def command_batch(
+    config_path: Annotated[
+        Path,
+        Argument(help="A TOML file listing the accounts to export, and where to", dir_okay=False),
+    ],
+) -> None:
+    """Export the followers or following of many accounts at once, one file for each."""
+    from .batch import load_config, run_batch
+
+    try:
+        config = load_config(config_path)
+    except (OSError, ValueError) as e:
+        error("Can't read that config!", e)
+        sys_exit(1)
+
+    def done(result: "BatchResult") -> None:
+        if result.error is None:
+            print(f"Exported {result.rows} {result.query} of [b]{result.account}[/b]")
+        else:
+            error(f"Couldn't export {result.query} of {result.account}!", result.error)
+
+    results = run_batch(config, done)
+
+    table = Table("Account", "List", "Accounts", "File", title="Batch export")
+    for result in results:
+        table.add_row(
+            result.account,
+            result.query,
+            str(result.rows),
+            str(result.path) if result.path else "[red]Failed",
+        )
+    print(table)
+    if any(result.error is not None for result in results):
+        sys_exit(1)
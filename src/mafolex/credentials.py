@@ -0,0 +1,68 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter
+
+import keyring
+
+from . import trace
+
+_INSTANCE_DOMAIN = "mafolex/instance-domain"
+
+
+class CredentialStore:
+    """Credentials kept in the system keyring, read at most once per process.
+
+    Some keyring backends take tens of milliseconds per call, so every entry is cached in memory the
+    first time it is read. Writes go straight through to the keyring and update the cache.
+    """
+
+    def __init__(self, instance_domain: str | None = None, access_token: str | None = None) -> None:
+        """Use the given instance and access token rather than the ones saved in the keyring.
+
+        Given both, the keyring isn't touched at all, so accounts can be used on machines without
+        one, and several accounts on the same instance can be used at once.
+        """
+        self._cache: dict[str, str | None] = {}
+        if instance_domain is not None:
+            self._cache[_INSTANCE_DOMAIN] = instance_domain
+            if access_token is not None:
+                self._cache[f"mafolex/access-token/{instance_domain}"] = access_token
+                self._cache[f"mafolex/client-id/{instance_domain}"] = None
+                self._cache[f"mafolex/client-secret/{instance_domain}"] = None
+        self.reads: Counter[str] = Counter()
+        self.writes: Counter[str] = Counter()
+
+    def _read(self, service: str) -> str | None:
+        if service not in self._cache:
+            self.reads[service] += 1
+            with trace.span("keyring", "get", service=service):
+                c = keyring.get_credential(service, None)
+            self._cache[service] = c.password if c else None
+        return self._cache[service]
+
+    def _write(self, service: str, v: str) -> None:
+        self.writes[service] += 1
+        with trace.span("keyring", "set", service=service):
+            keyring.set_password(service, "", v)
+        self._cache[service] = v
+
+    @property
+    def instance_domain(self) -> str | None:
+        return self._read(_INSTANCE_DOMAIN)
+
+    @instance_domain.setter
+    def instance_domain(self, v: str) -> None:
+        self._write(_INSTANCE_DOMAIN, v)
+
+    def get(self, key: str) -> str | None:
+        if not self.instance_domain:
+            return None
+        return self._read(f"mafolex/{key}/{self.instance_domain}")
+
+    def set(self, key: str, v: str) -> None:
+        if not self.instance_domain:
+            msg = "Missing instance domain. This shouldn't happen!"
+            raise RuntimeError(msg)
+        self._write(f"mafolex/{key}/{self.instance_domain}", v)
@@ -0,0 +1,127 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import heapq
+import pickle
+from enum import StrEnum, auto
+from itertools import batched, groupby
+from operator import itemgetter
+from tempfile import TemporaryFile
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import IO
+
+    from .snapshot import UserFields
+
+# How many accounts are sorted in memory at once. Longer lists are sorted a run of this many at a
+# time, and the runs are kept in temporary files until they're merged back together.
+RUN_SIZE = 100_000
+
+# How many accounts are written to or read from a run in one go.
+_CHUNK_SIZE = 1024
+
+_username = itemgetter(0)
+
+
+class ChangeKind(StrEnum):
+    added = auto()
+    removed = auto()
+    changed = auto()
+
+
+class Change(NamedTuple):
+    """An account that's only in one of two lists, or whose note or mutual status differs.
+
+    `user` is the account as it is in the newer list, or in the older one if it was removed.
+    `previous` is how a changed account was in the older list.
+    """
+
+    kind: ChangeKind
+    user: "UserFields"
+    previous: "UserFields | None" = None
+
+
+def _spill(run: "list[UserFields]") -> "IO[bytes]":
+    # Closed once the run has been read back.
+    f = TemporaryFile()  # noqa: SIM115
+    for chunk in batched(run, _CHUNK_SIZE, strict=False):
+        pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _read_run(f: "IO[bytes]") -> "Iterator[UserFields]":
+    with f:
+        while True:
+            try:
+                # Only ever a file we've just written ourselves.
+                chunk: tuple[UserFields, ...] = pickle.load(f)  # noqa: S301
+            except EOFError:
+                return
+            yield from chunk
+
+
+def sort_users(users: "Iterable[UserFields]", run_size: int = RUN_SIZE) -> "Iterator[UserFields]":
+    """Sort accounts by username, holding no more than two runs of them in memory at once.
+
+    The accounts are all read before this returns, and then merged from the sorted runs as the
+    result is iterated over.
+    """
+    runs: list[IO[bytes]] = []
+    last: list[UserFields] = []
+    for run in batched(users, run_size, strict=False):
+        if last:
+            runs.append(_spill(last))
+        last = sorted(run, key=_username)
+    if runs:
+        # Only a list that fits in one run is kept in memory until it's merged.
+        runs.append(_spill(last))
+        last = []
+    return heapq.merge(*map(_read_run, runs), last, key=_username)
+
+
+def _unique(users: "Iterator[UserFields]") -> "Iterator[UserFields]":
+    # A list fetched while it's changing can have the same account twice.
+    return (next(group) for _, group in groupby(users, _username))
+
+
+def _merge(old: "Iterator[UserFields]", new: "Iterator[UserFields]") -> "Iterator[Change]":
+    old_user = next(old, None)
+    new_user = next(new, None)
+    while old_user is not None and new_user is not None:
+        if old_user[0] < new_user[0]:
+            yield Change(ChangeKind.removed, old_user)
+            old_user = next(old, None)
+        elif new_user[0] < old_user[0]:
+            yield Change(ChangeKind.added, new_user)
+            new_user = next(new, None)
+        else:
+            # Compare the note and mutual status.
+            if old_user[2] != new_user[2] or old_user[4] != new_user[4]:
+                yield Change(ChangeKind.changed, new_user, old_user)
+            old_user = next(old, None)
+            new_user = next(new, None)
+
+    if old_user is not None:
+        yield Change(ChangeKind.removed, old_user)
+        yield from (Change(ChangeKind.removed, user) for user in old)
+    if new_user is not None:
+        yield Change(ChangeKind.added, new_user)
+        yield from (Change(ChangeKind.added, user) for user in new)
+
+
+def diff(
+    old: "Iterable[UserFields]", new: "Iterable[UserFields]", run_size: int = RUN_SIZE
+) -> "Iterator[Change]":
+    """Compare two lists of accounts, matching them up by username.
+
+    Each list is sorted by username, then the two are merged, so the changes come out in username
+    order. The older list is read to the end before the newer one is started, and only a few runs
+    of `run_size` accounts are ever held in memory at once.
+    """
+    old_users = _unique(sort_users(old, run_size))
+    new_users = _unique(sort_users(new, run_size))
+    return _merge(old_users, new_users)
@@ -0,0 +1,182 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import shlex
+import shutil
+import subprocess
+from collections import Counter
+from contextlib import contextmanager, suppress
+from dataclasses import fields
+from itertools import batched
+from typing import TYPE_CHECKING, cast, override
+
+from rich import box
+from rich.cells import cell_len
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from . import trace
+from .diff import Change, ChangeKind
+from .wrapper import PAGE_SIZE, User
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+    from typing import IO
+
+HEADERS = tuple(str(field.metadata["display"]) for field in fields(User))
+CHANGE_HEADERS = ("Change", *HEADERS)
+
+_CHANGE_STYLES = {
+    ChangeKind.added: "green",
+    ChangeKind.removed: "red",
+    ChangeKind.changed: "yellow",
+}
+
+# The space rich puts between two columns: padding on either side, and the divider.
+COLUMN_GAP = 3
+
+# Columns are never squeezed narrower than this to fit the console.
+MIN_WIDTH = 6
+
+
+def _cells(user: User) -> list[Text]:
+    cells = [Text(value) for value in (user.username, user.display_name, user.note, user.url)]
+    cells.append(Text("yes", style="green") if user.mutual else Text("no", style="red"))
+    return cells
+
+
+def _fit(widths: list[int], available: int) -> list[int]:
+    """Narrow the widest columns until they all fit in the available space."""
+    widths = list(widths)
+    while sum(widths) > available and max(widths) > MIN_WIDTH:
+        widths[widths.index(max(widths))] -= 1
+    return widths
+
+
+def _measure(
+    rows: "Sequence[Sequence[Text]]", available: int, headers: "Sequence[str]"
+) -> list[int]:
+    widths = [cell_len(header) for header in headers]
+    for row in rows:
+        for column, cell in enumerate(row):
+            longest = max((cell_len(line) for line in cell.plain.splitlines()), default=0)
+            widths[column] = max(widths[column], longest)
+    return _fit(widths, available - COLUMN_GAP * (len(widths) - 1))
+
+
+def _table(widths: "Sequence[int]", header: bool, headers: "Sequence[str]") -> Table:
+    # No outer edges, so tables printed one after the other read as one.
+    table = Table(box=box.SIMPLE_HEAD, show_edge=False, show_header=header, pad_edge=False)
+    for name, width in zip(headers, widths, strict=True):
+        table.add_column(name, width=width, overflow="fold")
+    return table
+
+
+def _print_rows(  # noqa: PLR0913, PLR0917
+    console: Console,
+    rows: "Iterable[Sequence[Text]]",
+    headers: "Sequence[str]",
+    title: str,
+    header: bool,
+    caption: "Callable[[], str] | None",
+) -> None:
+    widths: list[int] | None = None
+    width = console.width
+    for page in batched(rows, PAGE_SIZE, strict=False):
+        with trace.span("output", "table", rows=len(page)):
+            if widths is None:
+                widths = _measure(page, console.width, headers)
+                width = sum(widths) + COLUMN_GAP * (len(widths) - 1)
+                console.print(title, justify="center", width=width, style="table.title")
+                table = _table(widths, header, headers)
+            else:
+                table = _table(widths, False, headers)
+            for row in page:
+                table.add_row(*row)
+            console.print(table)
+
+    if caption is not None:
+        console.print(caption(), justify="center", width=width, style="table.caption")
+
+
+def print_users(
+    console: Console,
+    users: "Iterable[User]",
+    title: str,
+    header: bool = True,
+    caption: "Callable[[], str] | None" = None,
+) -> None:
+    """Print users as a table, a page at a time as they arrive.
+
+    The column widths are measured from the first page, so nothing is printed until that's ready,
+    and nothing needs holding on to after each page is printed. Later values too wide for their
+    column wrap onto another line.
+    """
+    _print_rows(console, map(_cells, users), HEADERS, title, header, caption)
+
+
+def _change_cells(change: Change) -> list[Text]:
+    username, display_name, note, url, mutual = change.user
+    cells = [Text(change.kind, style=_CHANGE_STYLES[change.kind])]
+    cells.extend(Text(value) for value in (username, display_name, note, url))
+    cells.append(Text("yes", style="green") if mutual else Text("no", style="red"))
+    if change.previous is not None:
+        # Show what the note and mutual status were, where they've changed.
+        _, _, old_note, _, old_mutual = change.previous
+        if old_note != note:
+            cells[3] = Text.assemble((old_note, "strike bright_black"), " ", (note, "yellow"))
+        if old_mutual != mutual:
+            cells[5] = Text.assemble("yes → " if old_mutual else "no → ", cells[5])
+    return cells
+
+
+def print_changes(
+    console: Console, changes: "Iterable[Change]", title: str, header: bool = True
+) -> None:
+    """Print the differences between two lists as a table, a page at a time.
+
+    A count of each kind of change goes underneath.
+    """
+    counts = Counter[ChangeKind]()
+
+    def counted() -> "Iterator[Change]":
+        for change in changes:
+            counts[change.kind] += 1
+            yield change
+
+    def caption() -> str:
+        return ", ".join(f"{counts[kind]} {kind}" for kind in ChangeKind)
+
+    _print_rows(console, map(_change_cells, counted()), CHANGE_HEADERS, title, header, caption)
+
+
+class _PagerConsole(Console):
+    @override
+    def on_broken_pipe(self) -> None:
+        # Rich's default points standard output at /dev/null and exits, but it's only the pager that
+        # went away.
+        raise BrokenPipeError
+
+
+@contextmanager
+def pager() -> "Generator[Console]":
+    """A console that feeds a pager as it's printed to, so the first page shows up straight away.
+
+    The pager is whatever `$PAGER` says, or `less`. If it's closed before everything's been printed,
+    printing stops quietly.
+    """
+    command = shlex.split(os.environ.get("PAGER") or ("more" if os.name == "nt" else "less -R"))
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, encoding="utf-8")  # noqa: S603
+    stdin = cast("IO[str]", process.stdin)
+    try:
+        with suppress(BrokenPipeError):
+            yield _PagerConsole(
+                file=stdin, force_terminal=True, width=shutil.get_terminal_size().columns
+            )
+    finally:
+        with suppress(BrokenPipeError):
+            stdin.close()
+        process.wait()
@@ -0,0 +1,90 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# The columns we search in: username, display name and note.
+SEARCH_COLUMNS = (0, 1, 2)
+
+
+def _search_text(keys: "Sequence[str]") -> str:
+    # Joined with a character nobody types, so a search can't match across two columns.
+    return "\0".join(keys[column] for column in SEARCH_COLUMNS)
+
+
+def matches(text: str, cells: "Sequence[str]") -> bool:
+    """Whether a row of an account table contains the given search text."""
+    return text.casefold() in _search_text([cell.casefold() for cell in cells])
+
+
+class SearchIndex:
+    """Case-folded copies of an account table's contents, for searching and sorting it quickly.
+
+    A search scans one string per row, or only the previous results if the search text has just
+    grown longer, as it does while typing. Each column's sort order is worked out up front, and
+    again the first time it's needed after the table changes.
+    """
+
+    def __init__(self, columns: "Sequence[Sequence[str]]") -> None:
+        self._keys = [[cell.casefold() for cell in column] for column in columns]
+        self._texts = [_search_text(keys) for keys in zip(*self._keys, strict=True)]
+        self._orders = {column: self._sort(column) for column in range(len(self._keys))}
+        self._needle = ""
+        self._matches: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def insert(self, first: int, rows: "Sequence[Sequence[str]]") -> None:
+        """Insert rows of display strings before the given row."""
+        keys = [[cell.casefold() for cell in row] for row in rows]
+        for column, cells in enumerate(self._keys):
+            cells[first:first] = [row[column] for row in keys]
+        self._texts[first:first] = map(_search_text, keys)
+        self._changed()
+
+    def remove(self, first: int, last: int) -> None:
+        """Remove rows `first` to `last`, inclusive."""
+        for cells in self._keys:
+            del cells[first : last + 1]
+        del self._texts[first : last + 1]
+        self._changed()
+
+    def update(self, row: int, cells: "Sequence[str]") -> None:
+        keys = [cell.casefold() for cell in cells]
+        for column, key in enumerate(keys):
+            self._keys[column][row] = key
+        self._texts[row] = _search_text(keys)
+        self._changed()
+
+    def search(self, text: str) -> list[int]:
+        """The rows that contain the given text, in table order."""
+        needle = text.casefold()
+        texts = self._texts
+        if self._needle and self._needle in needle:
+            rows = [row for row in self._matches if needle in texts[row]]
+        else:
+            rows = [row for row, haystack in enumerate(texts) if needle in haystack]
+        self._needle = needle
+        self._matches = rows
+        return rows
+
+    def order(self, column: int) -> list[int]:
+        """The rows sorted by the given column. The list is shared, so don't change it."""
+        order = self._orders.get(column)
+        if order is None:
+            order = self._orders[column] = self._sort(column)
+        return order
+
+    def _sort(self, column: int) -> list[int]:
+        keys = self._keys[column]
+        return sorted(range(len(keys)), key=keys.__getitem__)
+
+    def _changed(self) -> None:
+        self._orders.clear()
+        self._needle = ""
+        self._matches = []
@@ -2,25 +2,131 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from dataclasses import astuple, fields
+from dataclasses import fields
+from functools import partial
 from typing import TYPE_CHECKING, Literal, overload, override
 
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtCore import (
+    QAbstractProxyModel,
+    QAbstractTableModel,
+    QModelIndex,
+    Qt,
+    QThreadPool,
+    Slot,
+)
 from PySide6.QtWidgets import QHeaderView, QTableView
 
-from mafolex.wrapper import User
+from mafolex.wrapper import User, UserTable
+
+from .search import SearchIndex, matches
+from .worker import BuildIndexWorker
 
 TOP_LEVEL_INDEX = QModelIndex()
+HEADERS = tuple(str(f.metadata["display"]) for f in fields(User))
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
     from PySide6.QtCore import QObject, QPersistentModelIndex
     from PySide6.QtWidgets import QWidget
 
 
 class AccountTableModel(QAbstractTableModel):
-    def __init__(self, parent: "QObject | None" = None, data: list[User] | None = None) -> None:
+    """A table of accounts, which can be refreshed in place.
+
+    A refresh is a `begin_refresh` call, any number of `merge` calls as pages of accounts arrive,
+    and an `end_refresh` call once they've all been merged. Only the rows that changed are touched,
+    so the view keeps its selection and scroll position. Since lists come newest first, accounts we
+    haven't seen before are inserted above those we already had, in the order they arrive.
+    """
+
+    def __init__(self, parent: "QObject | None" = None, data: UserTable | None = None) -> None:
         super().__init__(parent)
-        self._data = data or []
+        self._data = data if data is not None else UserTable()
+        # Display strings, one list per column, so painting a cell is just two lookups.
+        self._columns: list[list[str]] = [[] for _ in HEADERS]
+        self._set_cells(0, 0, list(self._data))
+        # During a refresh: the row each account had when it started, the accounts merged so far,
+        # and how many new rows have been inserted at the top since.
+        self._rows: dict[str, int] = {}
+        self._seen: set[str] = set()
+        self._inserted = 0
+
+    @property
+    def users(self) -> UserTable:
+        return self._data
+
+    def begin_refresh(self) -> None:
+        """Start merging a fresh copy of the list into the table."""
+        self._rows = {username: row for row, username in enumerate(self._usernames)}
+        self._seen = set()
+        self._inserted = 0
+
+    def merge(self, users: list[User]) -> None:
+        """Insert new accounts, and update those whose details have changed."""
+        new: list[User] = []
+        for user in users:
+            self._seen.add(user.username)
+            old_row = self._rows.get(user.username)
+            if old_row is None:
+                new.append(user)
+                continue
+            row = old_row + self._inserted
+            if self._data[row] != user:
+                self._data[row] = user
+                self._set_cells(row, row + 1, [user])
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+        if new:
+            first = self._inserted
+            self.beginInsertRows(TOP_LEVEL_INDEX, first, first + len(new) - 1)
+            self._data.insert(first, new)
+            self._set_cells(first, first, new)
+            self.endInsertRows()
+            self._inserted += len(new)
+
+    def end_refresh(self) -> None:
+        """Remove the accounts that weren't merged since the refresh began."""
+        end = len(self._data)
+        # Work backwards, removing each run of consecutive stale rows at once.
+        while end > self._inserted:
+            if self._usernames[end - 1] in self._seen:
+                end -= 1
+                continue
+            start = end - 1
+            while start > self._inserted and self._usernames[start - 1] not in self._seen:
+                start -= 1
+            self.beginRemoveRows(TOP_LEVEL_INDEX, start, end - 1)
+            del self._data[start:end]
+            self._set_cells(start, end, [])
+            self.endRemoveRows()
+            end = start
+        self._rows = {}
+        self._seen = set()
+        self._inserted = 0
+
+    def columns(self) -> list[list[str]]:
+        """A copy of the display strings, one list per column."""
+        return [list(cells) for cells in self._columns]
+
+    def cell(self, row: int, column: int) -> str:
+        return self._columns[column][row]
+
+    def cells(self, row: int) -> tuple[str, ...]:
+        """The display strings in the given row."""
+        return tuple(cells[row] for cells in self._columns)
+
+    @property
+    def _usernames(self) -> list[str]:
+        return self._columns[0]
+
+    def _set_cells(self, start: int, end: int, users: list[User]) -> None:
+        """Replace the display strings for rows `start` to `end` with those of `users`."""
+        columns = list(zip(*(user.as_tuple() for user in users), strict=True))
+        if not columns:
+            columns = [()] * len(HEADERS)
+        for cells, values in zip(self._columns, columns, strict=True):
+            cells[start:end] = map(_display, values)
 
     @override
     def rowCount(self, parent: "QModelIndex | QPersistentModelIndex" = TOP_LEVEL_INDEX) -> int:
@@ -28,7 +134,7 @@ class AccountTableModel(QAbstractTableModel):
 
     @override
     def columnCount(self, parent: "QModelIndex | QPersistentModelIndex" = TOP_LEVEL_INDEX) -> int:
-        return len(fields(User))
+        return len(HEADERS)
 
     @overload
     def headerData(
@@ -53,7 +159,7 @@ class AccountTableModel(QAbstractTableModel):
             return None
         match orientation:
             case Qt.Orientation.Horizontal:
-                return fields(User)[section].metadata["display"]
+                return HEADERS[section]
             case Qt.Orientation.Vertical:
                 return str(section)
             case _:
@@ -78,24 +184,299 @@ class AccountTableModel(QAbstractTableModel):
         index: "QModelIndex | QPersistentModelIndex",
         role: int = Qt.ItemDataRole.DisplayRole,
     ) -> str | None:
-        account = self._data[index.row()]
-        value = astuple(account)[index.column()]
-        match role:
-            case Qt.ItemDataRole.DisplayRole:
-                if isinstance(value, str):
-                    return value
-                if isinstance(value, bool):
-                    return "Yes" if value else "No"
-                return str(value)
-            case _:
-                return None
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self._columns[index.column()][index.row()]
+
+
+def _display(value: object) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+class AccountFilterModel(QAbstractProxyModel):
+    """Searches and sorts an `AccountTableModel`, using a `SearchIndex` of its contents.
+
+    The index is built on another thread the first time it's needed, and kept up to date as the
+    table changes after that. Rows that arrive while the table is sorted are added at the end, and
+    rows that change stay where they are, until it's sorted again.
+    """
+
+    def __init__(self, source: AccountTableModel, parent: "QObject | None" = None) -> None:
+        super().__init__(parent)
+        self._source = source
+        # The source row shown in each of our rows, or None when we show every row in source order.
+        self._rows: list[int] | None = None
+        # Our row for each source row we show, worked out when it's needed.
+        self._positions: dict[int, int] | None = None
+        self._filter = ""
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._index: SearchIndex | None = None
+        # While the index is being built: the changes to the table since we took a copy of it.
+        self._pending: list[Callable[[SearchIndex], None]] | None = None
+        self._builder: BuildIndexWorker | None = None
+
+        self.setSourceModel(source)
+        source.rowsAboutToBeInserted.connect(self._rows_about_to_be_inserted)
+        source.rowsInserted.connect(self._rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._rows_about_to_be_removed)
+        source.rowsRemoved.connect(self._rows_removed)
+        source.dataChanged.connect(self._data_changed)
+
+    def set_filter(self, text: str) -> None:
+        """Only show the rows whose username, display name or note contain the given text."""
+        self._filter = text
+        self._apply()
+
+    @override
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        self._sort_column = column
+        self._sort_order = order
+        self._apply()
+
+    def _apply(self) -> None:
+        if not self._filter and self._sort_column < 0:
+            self._set_rows(None)
+            return
+        index = self._index
+        if index is None:
+            # We'll be back once the index is ready.
+            self._build_index()
+            return
+
+        rows: list[int] | None = None
+        if self._sort_column >= 0:
+            rows = index.order(self._sort_column)
+            rows = rows[::-1] if self._sort_order == Qt.SortOrder.DescendingOrder else list(rows)
+        if self._filter:
+            found = index.search(self._filter)
+            if rows is None:
+                rows = found
+            else:
+                shown = bytearray(len(index))
+                for row in found:
+                    shown[row] = 1
+                rows = [row for row in rows if shown[row]]
+        self._set_rows(rows)
+
+    def _set_rows(self, rows: list[int] | None) -> None:
+        if rows is None and self._rows is None:
+            return
+        total = self._source.rowCount()
+        before = self._rows if self._rows is not None else range(total)
+        after = rows if rows is not None else range(total)
+        if len(before) != len(after) or (
+            # Without a filter every row is shown, so only a filter can change which rows those are.
+            self._filter
+            and rows is not None
+            and self._rows is not None
+            and set(rows) != set(self._rows)
+        ):
+            self.beginResetModel()
+            self._rows = rows
+            self._positions = None
+            self.endResetModel()
+            return
+
+        # The same rows in a different order, so the view can hold on to its selection.
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [before[index.row()] for index in persistent]
+        self._rows = rows
+        self._positions = None
+        self.changePersistentIndexList(
+            persistent,
+            [
+                self.createIndex(self._position(row) or 0, index.column())
+                for row, index in zip(sources, persistent, strict=True)
+            ],
+        )
+        self.layoutChanged.emit()
+
+    def _position(self, source_row: int) -> int | None:
+        if self._rows is None:
+            return source_row
+        if self._positions is None:
+            self._positions = dict(zip(self._rows, range(len(self._rows)), strict=True))
+        return self._positions.get(source_row)
+
+    def _build_index(self) -> None:
+        if self._pending is not None:
+            return
+        self._pending = []
+        self._builder = BuildIndexWorker(self._source.columns())
+        self._builder.signals.finished.connect(self._index_built)
+        QThreadPool.globalInstance().start(self._builder)
+
+    @Slot()
+    def _index_built(self, index: SearchIndex) -> None:
+        for change in self._pending or []:
+            change(index)
+        self._index = index
+        self._pending = None
+        self._builder = None
+        self._apply()
+
+    def _change(self, change: "Callable[[SearchIndex], None]") -> None:
+        """Make a change to the index, or to the one being built once it's ready."""
+        if self._index is not None:
+            change(self._index)
+        elif self._pending is not None:
+            self._pending.append(change)
+
+    @Slot()
+    def _rows_about_to_be_inserted(
+        self, _parent: "QModelIndex | QPersistentModelIndex", first: int, last: int
+    ) -> None:
+        if self._rows is None:
+            self.beginInsertRows(TOP_LEVEL_INDEX, first, last)
+
+    @Slot()
+    def _rows_inserted(
+        self, _parent: "QModelIndex | QPersistentModelIndex", first: int, last: int
+    ) -> None:
+        cells = [self._source.cells(row) for row in range(first, last + 1)]
+        self._change(partial(SearchIndex.insert, first=first, rows=cells))
+        if self._rows is None:
+            self.endInsertRows()
+            return
+
+        count = last - first + 1
+        if first + count < self._source.rowCount():
+            self._rows = [row + count if row >= first else row for row in self._rows]
+        self._positions = None
+        new = [first + i for i, row in enumerate(cells) if matches(self._filter, row)]
+        if new:
+            start = len(self._rows)
+            self.beginInsertRows(TOP_LEVEL_INDEX, start, start + len(new) - 1)
+            self._rows.extend(new)
+            self.endInsertRows()
+
+    @Slot()
+    def _rows_about_to_be_removed(
+        self, _parent: "QModelIndex | QPersistentModelIndex", first: int, last: int
+    ) -> None:
+        if self._rows is None:
+            self.beginRemoveRows(TOP_LEVEL_INDEX, first, last)
+            return
+
+        # Work backwards, removing each run of consecutive rows at once.
+        positions = [i for i, row in enumerate(self._rows) if first <= row <= last]
+        while positions:
+            end = start = positions.pop()
+            while positions and positions[-1] == start - 1:
+                start = positions.pop()
+            self.beginRemoveRows(TOP_LEVEL_INDEX, start, end)
+            del self._rows[start : end + 1]
+            self._positions = None
+            self.endRemoveRows()
+
+    @Slot()
+    def _rows_removed(
+        self, _parent: "QModelIndex | QPersistentModelIndex", first: int, last: int
+    ) -> None:
+        self._change(partial(SearchIndex.remove, first=first, last=last))
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+
+        count = last - first + 1
+        self._rows = [row - count if row > last else row for row in self._rows]
+        self._positions = None
+
+    @Slot()
+    def _data_changed(
+        self,
+        top_left: "QModelIndex | QPersistentModelIndex",
+        bottom_right: "QModelIndex | QPersistentModelIndex",
+        roles: "Sequence[int]",
+    ) -> None:
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self._change(partial(SearchIndex.update, row=row, cells=self._source.cells(row)))
+            position = self._position(row)
+            if position is not None:
+                self.dataChanged.emit(
+                    self.createIndex(position, top_left.column()),
+                    self.createIndex(position, bottom_right.column()),
+                    roles,
+                )
+
+    @override
+    def data(
+        self,
+        index: "QModelIndex | QPersistentModelIndex",
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> str | None:
+        # Reads the source directly rather than mapping the index, since this runs for every cell
+        # that's painted.
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = index.row()
+        if self._rows is not None:
+            row = self._rows[row]
+        return self._source.cell(row, index.column())
+
+    @override
+    def mapToSource(self, proxyIndex: "QModelIndex | QPersistentModelIndex") -> QModelIndex:
+        if not proxyIndex.isValid():
+            return QModelIndex()
+        row = proxyIndex.row()
+        if self._rows is not None:
+            row = self._rows[row]
+        return self._source.index(row, proxyIndex.column())
+
+    @override
+    def mapFromSource(self, sourceIndex: "QModelIndex | QPersistentModelIndex") -> QModelIndex:
+        if not sourceIndex.isValid():
+            return QModelIndex()
+        position = self._position(sourceIndex.row())
+        if position is None:
+            return QModelIndex()
+        return self.createIndex(position, sourceIndex.column())
+
+    @override
+    def index(
+        self, row: int, column: int, parent: "QModelIndex | QPersistentModelIndex" = TOP_LEVEL_INDEX
+    ) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    @override
+    def parent(self, child: "QModelIndex | QPersistentModelIndex") -> QModelIndex:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return QModelIndex()
+
+    @override
+    def rowCount(self, parent: "QModelIndex | QPersistentModelIndex" = TOP_LEVEL_INDEX) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._rows) if self._rows is not None else self._source.rowCount()
+
+    @override
+    def columnCount(self, parent: "QModelIndex | QPersistentModelIndex" = TOP_LEVEL_INDEX) -> int:
+        if parent.isValid():
+            return 0
+        return self._source.columnCount()
 
 
 class AccountTableView(QTableView):
     def __init__(self, parent: "QWidget | None" = None) -> None:
         super().__init__(parent)
 
+        # Start out in the order the server lists accounts in, and come back to it after sorting by
+        # a column in both directions.
+        self.horizontalHeader().setSortIndicatorClearable(True)
+        self.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.setSortingEnabled(True)
+
         self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        # Size columns to the rows on screen, rather than measuring a thousand rows every time the
+        # table is sorted or searched.
+        self.horizontalHeader().setResizeContentsPrecision(0)
         self.horizontalHeader().setSectionsMovable(True)
         self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
 
@@ -12,6 +12,7 @@ from PySide6.QtWidgets import (
     QFrame,
     QHBoxLayout,
     QLabel,
+    QLineEdit,
     QMainWindow,
     QMenu,
     QPushButton,
@@ -24,12 +25,14 @@ from mafolex.wrapper import Mastodon
 from mafolex.writer import write_file
 
 from .dialogs import AboutDialog, CodeDialog, InstanceDialog
-from .table import AccountTableModel, AccountTableView
+from .table import AccountFilterModel, AccountTableModel, AccountTableView
 from .widgets import DisplayLabel, Throbber
-from .worker import GetRelationshipsWorker
+from .worker import GetAccountsWorker
 
 if TYPE_CHECKING:
-    from mafolex.wrapper import User
+    from mafolex.wrapper import User, UserTable
+
+QUERIES = ("followers", "following")
 
 
 class CentralWidget(QFrame):
@@ -38,6 +41,10 @@ class CentralWidget(QFrame):
         layout = QVBoxLayout(self)
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        self.search_box = QLineEdit(self, placeholderText="Search", clearButtonEnabled=True)
+        self.search_box.setVisible(False)
+        layout.addWidget(self.search_box)
+
         self.tab_widget = QTabWidget(self)
         self.tab_widget.setVisible(False)
         layout.addWidget(self.tab_widget)
@@ -63,14 +70,36 @@ class CentralWidget(QFrame):
         self.login_button.setVisible(False)
         layout.addWidget(self.login_button)
 
-        self.followers_data: list[User] = []
-        self.following_data: list[User] = []
+        self.followers_model = AccountTableModel(self)
+        self.followers_filter = AccountFilterModel(self.followers_model, self)
+        self.followers_table_view.setModel(self.followers_filter)
+        self.following_model = AccountTableModel(self)
+        self.following_filter = AccountFilterModel(self.following_model, self)
+        self.following_table_view.setModel(self.following_filter)
+        self.search_box.textChanged.connect(self.followers_filter.set_filter)
+        self.search_box.textChanged.connect(self.following_filter.set_filter)
+
+    def _model(self, query: str) -> AccountTableModel:
+        return self.followers_model if query == "followers" else self.following_model
+
+    @property
+    def followers_data(self) -> "UserTable":
+        return self.followers_model.users
+
+    @property
+    def following_data(self) -> "UserTable":
+        return self.following_model.users
+
+    def begin_refresh(self, query: str) -> None:
+        self._model(query).begin_refresh()
+
+    def end_refresh(self, query: str) -> None:
+        self._model(query).end_refresh()
 
     @Slot()
-    def fill_data(self, data: "tuple[list[User], list[User]]") -> None:
-        self.followers_data, self.following_data = data
-        self.followers_table_view.setModel(AccountTableModel(self, self.followers_data))
-        self.following_table_view.setModel(AccountTableModel(self, self.following_data))
+    def add_data(self, query: str, users: "list[User]") -> None:
+        self._model(query).merge(users)
+        self.search_box.setVisible(True)
         self.tab_widget.setVisible(True)
         self.hint_label.setVisible(False)
         self.login_button.setVisible(False)
@@ -91,6 +120,10 @@ class MainWindow(QMainWindow):
         super().__init__(parent)
 
         self.threadpool = QThreadPool(self)
+        # Followers and following are fetched at the same time, even on a single core.
+        self.threadpool.setMaxThreadCount(max(self.threadpool.maxThreadCount(), len(QUERIES)))
+        self._workers: list[GetAccountsWorker] = []
+        self._progress: dict[str, tuple[int, int]] = {}
 
         self.setWindowTitle("mafolex")
 
@@ -182,18 +215,53 @@ class MainWindow(QMainWindow):
             self._prompt_code()
         self.fill_data()
 
+    def _update_status(self) -> None:
+        if not self._progress:
+            self.action_status.setVisible(False)
+            return
+        self.action_status.status.setText(
+            "Fetching accounts: "
+            + ", ".join(
+                f"{fetched} of {total} {query}" if total else f"{fetched} {query}"
+                for query, (fetched, total) in self._progress.items()
+            )
+        )
+        self.action_status.setVisible(True)
+
     @Slot()
-    def _fill_data(self, data: "tuple[list[User], list[User]]") -> None:
-        self.central_widget.fill_data(data)
-        self.action_status.setVisible(False)
+    def _add_page(self, query: str, users: "list[User]", fetched: int, total: int) -> None:
+        self.central_widget.add_data(query, users)
+        self._progress[query] = (fetched, total)
+        self._update_status()
+
+    @Slot()
+    def _finish_query(self, query: str) -> None:
+        self.central_widget.end_refresh(query)
+        self._progress.pop(query, None)
+        self._update_status()
 
     @Slot()
     def fill_data(self) -> None:
-        worker = GetRelationshipsWorker(self.api)
-        self.action_status.status.setText("Fetching accounts")
-        self.action_status.setVisible(True)
-        worker.signals.result.connect(self._fill_data)
-        self.threadpool.start(worker)
+        # Any fetch that's still running from before is stale now, so stop it and stop listening to
+        # it. Otherwise it would go on spending the rate limit budget, and on a machine with few
+        # cores, hold up the new fetch until it finished.
+        for worker in self._workers:
+            worker.cancel()
+            worker.signals.page.disconnect(self._add_page)
+            worker.signals.finished.disconnect(self._finish_query)
+        self._workers.clear()
+
+        self._progress = dict.fromkeys(QUERIES, (0, 0))
+        self._update_status()
+
+        # Followers and following are fetched side by side, each filling in its own tab.
+        for query in QUERIES:
+            self.central_widget.begin_refresh(query)
+            worker = GetAccountsWorker(self.api, query)
+            worker.signals.page.connect(self._add_page)
+            worker.signals.finished.connect(self._finish_query)
+            self._workers.append(worker)
+            self.threadpool.start(worker)
 
     @Slot()
     def save(self) -> None:
@@ -2,6 +2,11 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+from contextlib import closing
+from itertools import batched
+from threading import Event
+from typing import TYPE_CHECKING, override
+
 from PySide6.QtCore import (
     QObject,
     QRunnable,
@@ -9,20 +14,64 @@ from PySide6.QtCore import (
     Slot,
 )
 
-from mafolex.wrapper import Mastodon
+from mafolex.wrapper import PAGE_SIZE, Mastodon
+
+from .search import SearchIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
 
+class GetAccountsWorker(QRunnable):
+    """Fetches followers or following, handing over each page as soon as it's ready."""
 
-class GetRelationshipsWorker(QRunnable):
     class Signals(QObject):
-        result = Signal(tuple)
+        # The query, the users on this page, how many have been fetched so far, and how many the
+        # server says there are in total.
+        page = Signal(str, list, int, int)
+        finished = Signal(str)
 
-    def __init__(self, api: Mastodon) -> None:
+    def __init__(self, api: Mastodon, query: str) -> None:
         super().__init__()
         self.api = api
-        self.signals = GetRelationshipsWorker.Signals()
+        self.query = query
+        self.signals = GetAccountsWorker.Signals()
+        self._cancelled = Event()
+
+    def cancel(self) -> None:
+        """Stop fetching after the page in progress, freeing its thread and rate limit budget."""
+        self._cancelled.set()
+
+    @Slot()
+    @override
+    def run(self) -> None:
+        total = self.api.reported_count(self.query)
+        users = (
+            self.api.iter_followers() if self.query == "followers" else self.api.iter_following()
+        )
+        fetched = 0
+        # Closing the stream stops the fetch, and anything it has waiting for budget.
+        with closing(users):
+            for page in batched(users, PAGE_SIZE, strict=False):
+                if self._cancelled.is_set():
+                    return
+                fetched += len(page)
+                self.signals.page.emit(self.query, list(page), fetched, total)
+        self.signals.finished.emit(self.query)
+
+
+class BuildIndexWorker(QRunnable):
+    """Builds a search index of an account table's contents."""
+
+    class Signals(QObject):
+        finished = Signal(SearchIndex)
+
+    def __init__(self, columns: "Sequence[Sequence[str]]") -> None:
+        super().__init__()
+        self.columns = columns
+        self.signals = BuildIndexWorker.Signals()
 
     @Slot()
+    @override
     def run(self) -> None:
-        followers = self.api.get_followers()
-        following = self.api.get_following()
-        self.signals.result.emit((followers, following))
+        self.signals.finished.emit(SearchIndex(self.columns))
@@ -0,0 +1,122 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import deque
+from datetime import UTC, datetime, timedelta
+from time import monotonic
+from typing import TYPE_CHECKING, override
+
+from rich.console import Console
+from rich.progress import BarColumn, Progress, ProgressColumn, TaskProgressColumn, TextColumn
+from rich.text import Text
+
+from .ratelimit import Priority
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from rich.progress import Task
+
+    from .ratelimit import RateLimitScheduler
+    from .wrapper import User
+
+# How far back the request rate is measured over.
+RATE_WINDOW = 30.0
+
+
+class _StatsColumn(ProgressColumn):
+    """Pages, request rate and ETA, read from the scheduler every time the display refreshes.
+
+    Reading them here rather than when accounts arrive keeps the ETA moving while we're waiting for
+    the rate limit, when no accounts arrive at all.
+    """
+
+    def __init__(self, progress: "ExportProgress") -> None:
+        super().__init__()
+        self.progress = progress
+
+    @override
+    def render(self, task: "Task") -> Text:
+        progress = self.progress
+        pages = progress.scheduler.sent[Priority.PAGINATION] - progress.pages_before
+        text = Text.assemble(
+            (f"{pages:,}", "bold"),
+            " pages, ",
+            (f"{progress.request_rate():.1f}", "bold"),
+            " requests/s, ",
+        )
+        eta = progress.eta(task)
+        if eta is None:
+            text.append("ETA -:--:--", style="progress.remaining")
+        else:
+            text.append(f"ETA {timedelta(seconds=round(eta))}", style="progress.remaining")
+        if progress.scheduler.remaining <= 0:
+            text.append(" (waiting for the rate limit)", style="yellow")
+        return text
+
+
+class ExportProgress:
+    """Shows how far an export has got on standard error, so it doesn't mix with the output.
+
+    The total comes from the counts on the account, so it's known before the first page arrives.
+    The ETA is the later of two estimates: how long the remaining accounts take at the current
+    pace, and when the scheduler says the requests still to come can be sent within the rate limit.
+    """
+
+    def __init__(
+        self,
+        scheduler: "RateLimitScheduler",
+        total: int,
+        description: str,
+        console: Console | None = None,
+    ) -> None:
+        self.scheduler = scheduler
+        self.total = total
+        self.pages_before = scheduler.sent[Priority.PAGINATION]
+        # When each of the recent samples of the total requests sent was taken, and the total.
+        self._samples: deque[tuple[float, int]] = deque([(monotonic(), self._requests())])
+        self._progress = Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            TextColumn("{task.completed:,}/{task.total:,} accounts,"),
+            _StatsColumn(self),
+            console=console or Console(stderr=True),
+            redirect_stdout=False,
+            redirect_stderr=False,
+            transient=True,
+        )
+        self._task = self._progress.add_task(description, total=total)
+
+    def _requests(self) -> int:
+        return self.scheduler.sent.total()
+
+    def request_rate(self) -> float:
+        """Requests per second, over the last `RATE_WINDOW` seconds."""
+        now, sent = monotonic(), self._requests()
+        self._samples.append((now, sent))
+        while len(self._samples) > 1 and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+        then, before = self._samples[0]
+        return (sent - before) / (now - then) if now > then else 0.0
+
+    def eta(self, task: "Task") -> float | None:
+        """Seconds until the export should be done, or `None` until there's a pace to go by."""
+        remaining = max(self.total - int(task.completed), 0)
+        if not remaining:
+            return 0.0
+        if not task.speed:
+            return None
+        limited = (self.scheduler.projected_completion() - datetime.now(UTC)).total_seconds()
+        return max(remaining / task.speed, limited, 0.0)
+
+    def track(self, users: "Generator[User]") -> "Generator[User]":
+        """Pass on the users, counting each one. Closing this closes `users` too."""
+        with self._progress:
+            try:
+                for user in users:
+                    self._progress.advance(self._task)
+                    yield user
+            finally:
+                users.close()
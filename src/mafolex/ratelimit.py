@@ -0,0 +1,166 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from enum import IntEnum
+from math import ceil
+from threading import Condition, Event
+from time import perf_counter, time
+from typing import TYPE_CHECKING
+
+from . import trace
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from mastodon import Mastodon as MastodonAPI
+
+# Mastodon's default budget: 300 requests for every five-minute window.
+DEFAULT_LIMIT = 300
+DEFAULT_WINDOW = timedelta(minutes=5)
+
+
+class Priority(IntEnum):
+    """What a request is for. When both are waiting for budget, pagination goes first."""
+
+    PAGINATION = 0
+    ENRICHMENT = 1
+
+
+class RequestCancelledError(Exception):
+    """A request was given up on while it was waiting for budget."""
+
+
+class RateLimitScheduler:
+    """Spends the instance's request budget without ever running into its rate limit.
+
+    The budget is shared by everything the wrapper does, so followers and following can be fetched
+    at the same time. Each request takes a token before it's sent; once the tokens run out, requests
+    wait for the window to reset. After each response, the budget is corrected from the
+    `X-RateLimit-*` headers the server sent, which Mastodon.py keeps on the client.
+    """
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, window: timedelta = DEFAULT_WINDOW) -> None:
+        self.limit = limit
+        self.remaining = limit
+        self.window = window.total_seconds()
+        self.reset = time() + self.window
+        # Whether the budget for this window is still our own guess, rather than the server's.
+        self._guessed = True
+        # The total time requests have spent waiting for budget, added up across threads.
+        self.waited = 0.0
+        self.outstanding: Counter[Priority] = Counter()
+        # How many requests have been sent for each purpose.
+        self.sent: Counter[Priority] = Counter()
+        self._waiting: Counter[Priority] = Counter()
+        self._in_flight = 0
+        self._condition = Condition()
+
+    def expect(self, priority: Priority, requests: int) -> None:
+        """Note that this many requests are still to come, for the projected completion time."""
+        with self._condition:
+            self.outstanding[priority] += requests
+
+    def _refill(self, now: float) -> None:
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset = now + self.window
+            self._guessed = True
+
+    def cancel(self, cancelled: Event) -> None:
+        """Give up on the requests waiting with `cancelled`, rather than when budget frees up."""
+        with self._condition:
+            cancelled.set()
+            self._condition.notify_all()
+
+    def _acquire(self, priority: Priority, cancelled: Event | None = None) -> float:
+        """Take a token, returning how long we had to wait for it.
+
+        Raises:
+            RequestCancelledError: `cancel` was called with `cancelled` before a token was free.
+        """
+        waited = 0.0
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    if cancelled is not None and cancelled.is_set():
+                        # Whatever was queued behind us may be able to go now.
+                        self._condition.notify_all()
+                        raise RequestCancelledError
+                    now = time()
+                    self._refill(now)
+                    ahead = sum(n for p, n in self._waiting.items() if p < priority)
+                    if self.remaining > 0 and not ahead:
+                        break
+                    started = time()
+                    self._condition.wait(max(self.reset - now, 0) if ahead == 0 else None)
+                    elapsed = time() - started
+                    waited += elapsed
+                    self.waited += elapsed
+            finally:
+                self._waiting[priority] -= 1
+            self.remaining -= 1
+            self._in_flight += 1
+            self.sent[priority] += 1
+            if self.outstanding[priority] > 0:
+                self.outstanding[priority] -= 1
+        return waited
+
+    def _observe(self, api: "MastodonAPI") -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self.limit = api.ratelimit_limit
+            # Requests still in flight have taken a token, but the server hasn't counted them yet.
+            remaining = api.ratelimit_remaining - self._in_flight
+            reset = api.ratelimit_reset
+            if reset > self.reset + 1 or (self._guessed and reset > time()):
+                # The server has started a new window, or told us about this one for the first time.
+                self.reset = reset
+                self.remaining = remaining
+                self._guessed = False
+            else:
+                if time() < reset < self.reset - 1:
+                    # The window ends sooner than we guessed, because it started before we did.
+                    # A reset that has already passed is from a response to an older window.
+                    self.reset = reset
+                self.remaining = min(self.remaining, remaining)
+            self._condition.notify_all()
+
+    @contextmanager
+    def request(
+        self, priority: Priority, api: "MastodonAPI", cancelled: Event | None = None
+    ) -> "Generator[None]":
+        """Wait for budget to make a request with `api`, then account for it once it's done.
+
+        Raises:
+            RequestCancelledError: `cancel` was called with `cancelled` while we were waiting.
+        """
+        stage = priority.name.lower()
+        start = perf_counter()
+        if waited := self._acquire(priority, cancelled):
+            trace.record("rate limit", stage, start)
+        try:
+            with trace.span(stage, "request", rate_limit_wait=waited):
+                yield
+        finally:
+            self._observe(api)
+
+    def projected_completion(self, requests: int | None = None) -> datetime:
+        """When the given number of requests, or all those expected, could be done at the latest.
+
+        This only accounts for the rate limit, since that's what dominates on large accounts.
+        """
+        with self._condition:
+            if requests is None:
+                requests = self.outstanding.total()
+            now = time()
+            self._refill(now)
+            finish = now
+            if requests > self.remaining:
+                windows = ceil((requests - self.remaining) / self.limit)
+                finish = self.reset + (windows - 1) * self.window
+        return datetime.fromtimestamp(finish, UTC)
@@ -0,0 +1,157 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from datetime import datetime
+from time import sleep, time
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+from mastodon import MastodonAPIError, MastodonNetworkError, MastodonNotFoundError
+from requests import RequestException
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from requests import Response, Session
+
+    Params = dict[str, str | int | Sequence[str] | None]
+
+# How many times a request is retried after running into the rate limit anyway.
+RATE_LIMIT_RETRIES = 3
+
+# How long to wait for the server before giving up on a request, as mastodon.py does by default.
+REQUEST_TIMEOUT = 300.0
+
+_HTTP_TOO_MANY_REQUESTS = 429
+_HTTP_NOT_FOUND = 404
+
+
+class RawAccount(NamedTuple):
+    """The fields of an account we use, straight from the JSON."""
+
+    id: str
+    acct: str
+    display_name: str
+    url: str
+
+
+class RawRelationship(NamedTuple):
+    id: str
+    note: str
+    following: bool
+    followed_by: bool
+
+
+class RawPage(list[RawAccount]):
+    """A page of accounts, with the parameters for the next page where mastodon.py keeps them."""
+
+    __slots__ = ("_pagination_next", "next_url")
+
+    def __init__(self, accounts: "list[RawAccount]", next_url: str | None) -> None:
+        super().__init__(accounts)
+        self.next_url = next_url
+        self._pagination_next: dict[str, object] | None = None
+        if next_url is not None and (max_id := parse_qs(urlsplit(next_url).query).get("max_id")):
+            self._pagination_next = {"max_id": max_id[0]}
+
+
+class RawClient:
+    """Fetches account lists and relationships without building mastodon.py objects.
+
+    Mastodon.py turns every account into a fully typed `Account`, with its emojis, fields, roles and
+    dates, which on a large list costs far more CPU and memory than the requests themselves. This
+    decodes each page's JSON and keeps only the four fields a `User` needs.
+
+    It has the same methods and rate limit attributes as the parts of mastodon.py's client that
+    pagination and relationship lookups use, so it can stand in for it there.
+    """
+
+    def __init__(
+        self,
+        api_base_url: str,
+        access_token: str | None,
+        session: "Session",
+        *,
+        user_agent: str,
+        request_timeout: float = REQUEST_TIMEOUT,
+    ) -> None:
+        if not api_base_url.startswith(("http://", "https://")):
+            api_base_url = f"https://{api_base_url}"
+        self.api_base_url = api_base_url.rstrip("/")
+        self.session = session
+        self.request_timeout = request_timeout
+        self.headers = {"User-Agent": user_agent}
+        if access_token:
+            self.headers["Authorization"] = f"Bearer {access_token}"
+        self.ratelimit_limit = 300
+        self.ratelimit_remaining = 300
+        self.ratelimit_reset = time()
+
+    def _observe(self, response: "Response") -> None:
+        headers = response.headers
+        if "X-RateLimit-Remaining" in headers:
+            self.ratelimit_limit = int(headers["X-RateLimit-Limit"])
+            self.ratelimit_remaining = int(headers["X-RateLimit-Remaining"])
+            reset = headers["X-RateLimit-Reset"]
+            self.ratelimit_reset = datetime.fromisoformat(reset).timestamp()
+
+    def _get(self, url: str, params: "Params | None" = None) -> "Response":
+        retries = 0
+        while True:
+            try:
+                response = self.session.get(
+                    url, params=params, headers=self.headers, timeout=self.request_timeout
+                )
+            except RequestException as e:
+                msg = f"Could not complete request: {e}"
+                raise MastodonNetworkError(msg) from e
+            self._observe(response)
+            if response.status_code != _HTTP_TOO_MANY_REQUESTS or retries == RATE_LIMIT_RETRIES:
+                break
+            retries += 1
+            # The budget is shared with whatever else is using this token, so we can still run out.
+            sleep(max(self.ratelimit_reset - time(), 1))
+        if not response.ok:
+            error_type = (
+                MastodonNotFoundError
+                if response.status_code == _HTTP_NOT_FOUND
+                else MastodonAPIError
+            )
+            msg = "Mastodon API returned error"
+            raise error_type(msg, response.status_code, response.reason, response.text)
+        return response
+
+    def _page(self, url: str, params: "Params | None" = None) -> RawPage:
+        response = self._get(url, params)
+        accounts = [
+            RawAccount(a["id"], a["acct"], a["display_name"], a["url"]) for a in response.json()
+        ]
+        return RawPage(accounts, response.links.get("next", {}).get("url"))
+
+    def _list(self, account: object, query: str, max_id: str | None, limit: int | None) -> RawPage:
+        params: Params = {"max_id": max_id, "limit": limit}
+        account_id = getattr(account, "id", account)
+        return self._page(f"{self.api_base_url}/api/v1/accounts/{account_id}/{query}", params)
+
+    def account_followers(
+        self, account: object, max_id: str | None = None, limit: int | None = None
+    ) -> RawPage:
+        return self._list(account, "followers", max_id, limit)
+
+    def account_following(
+        self, account: object, max_id: str | None = None, limit: int | None = None
+    ) -> RawPage:
+        return self._list(account, "following", max_id, limit)
+
+    def fetch_next(self, page: RawPage) -> RawPage | None:
+        # The link already has the parameters for the next page in it.
+        next_url = page.next_url
+        return self._page(next_url) if next_url is not None else None
+
+    def account_relationships(self, ids: "Sequence[str]") -> list[RawRelationship]:
+        response = self._get(f"{self.api_base_url}/api/v1/accounts/relationships", {"id[]": ids})
+        return [
+            RawRelationship(str(r["id"]), r.get("note") or "", r["following"], r["followed_by"])
+            for r in response.json()
+        ]
@@ -0,0 +1,95 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import csv
+import gzip
+import json
+import sqlite3
+from contextlib import closing
+from typing import TYPE_CHECKING, cast
+
+from .writer import FIELDS, SQLITE_FORMATS, file_format, zstd
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from types import ModuleType
+    from typing import IO
+
+    from .snapshot import UserFields
+
+_BOOLEANS = {"True": True, "False": False}
+
+
+def _not_an_export(line: int) -> ValueError:
+    return ValueError(f"Line {line} doesn't look like an exported account")
+
+
+def read(f: "IO[str]") -> "Iterator[UserFields]":
+    """Read users from CSV written by `writer.write`, with or without its header."""
+    rows = csv.reader(f)
+    for row in rows:
+        if rows.line_num == 1 and tuple(row) == FIELDS:
+            continue
+        try:
+            username, display_name, note, url, mutual = row
+            user = (username, display_name, note, url, _BOOLEANS[mutual])
+        except (ValueError, KeyError):
+            raise _not_an_export(rows.line_num) from None
+        yield user
+
+
+def read_jsonl(f: "IO[str]") -> "Iterator[UserFields]":
+    """Read users from JSON Lines written by `writer.write_jsonl`."""
+    for line, text in enumerate(f, 1):
+        try:
+            fields = json.loads(text)
+            user = (
+                str(fields["username"]),
+                str(fields["display_name"]),
+                str(fields["note"]),
+                str(fields["url"]),
+                bool(fields["mutual"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            raise _not_an_export(line) from None
+        yield user
+
+
+def read_sqlite(path: "Path") -> "Iterator[UserFields]":
+    """Read users from a database written by `writer.write_sqlite`."""
+    with closing(sqlite3.connect(path)) as db:
+        try:
+            cursor = db.execute("SELECT username, display_name, note, url, mutual FROM accounts")
+        except sqlite3.DatabaseError as e:
+            msg = f"Not a database of exported accounts: {e}"
+            raise ValueError(msg) from None
+        for username, display_name, note, url, mutual in cursor:
+            yield username, display_name, note, url, bool(mutual)
+
+
+def _open(path: "Path", compression: str | None) -> "IO[str]":
+    match compression:
+        case ".gz":
+            return gzip.open(path, "rt", encoding="utf-8", newline="")
+        case ".zst":
+            return cast("ModuleType", zstd()).open(path, "rt", encoding="utf-8", newline="")
+        case _:
+            return path.open(newline="", encoding="utf-8")
+
+
+def read_file(path: "Path") -> "Iterator[UserFields]":
+    """Read users from a file written by `writer.write_file`, going by its extension.
+
+    Raises:
+        ValueError: The path's extensions ask for a format we can't read, or the file isn't in the
+            format they say.
+    """
+    extension, compression = file_format(path)
+    if extension in SQLITE_FORMATS:
+        yield from read_sqlite(path)
+        return
+
+    with _open(path, compression) as f:
+        yield from read_jsonl(f) if extension == ".jsonl" else read(f)
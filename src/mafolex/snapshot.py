@@ -0,0 +1,167 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import timedelta
+from time import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from .paths import cache_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable, Iterator, Sequence
+    from pathlib import Path
+
+DEFAULT_TTL = timedelta(days=7)
+
+# The username, display name, note, URL and mutual status of an account, in that order.
+UserFields = tuple[str, str, str, str, bool]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    instance TEXT NOT NULL,
+    account TEXT NOT NULL,
+    query TEXT NOT NULL,
+    hidden INTEGER NOT NULL,
+    PRIMARY KEY (instance, account, query)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    instance TEXT NOT NULL,
+    account TEXT NOT NULL,
+    query TEXT NOT NULL,
+    id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    note TEXT NOT NULL,
+    url TEXT NOT NULL,
+    mutual INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (instance, account, query, id)
+);
+CREATE INDEX IF NOT EXISTS accounts_rank ON accounts (instance, account, query, rank);
+"""
+
+
+class SnapshotKey(NamedTuple):
+    instance: str
+    account: str
+    query: str
+
+
+class SnapshotWriter:
+    def __init__(self, conn: sqlite3.Connection, key: SnapshotKey) -> None:
+        self._conn = conn
+        self._key = key
+        self.rows = 0
+
+    def add(self, account_id: str, fields: UserFields) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*self._key, account_id, self.rows, *fields, time()),
+        )
+        self.rows += 1
+
+
+class SnapshotCache:
+    """The last known followers and following of each account, kept in a local SQLite database.
+
+    Alongside the accounts themselves, we remember how many accounts the server reported that we
+    couldn't see in the list (for example, because they're suspended). That lets us tell whether a
+    snapshot plus the newly-fetched accounts adds up to the whole list, or whether something was
+    removed and we need to fetch everything again.
+    """
+
+    def __init__(self, path: "Path | None" = None, ttl: timedelta = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path or cache_dir() / "snapshots.sqlite3")
+        self._conn.executescript(_SCHEMA)
+
+    def hidden(self, key: SnapshotKey) -> int | None:
+        """How many accounts the server counted but didn't list, or `None` without a snapshot."""
+        row: tuple[int] | None = self._conn.execute(
+            "SELECT hidden FROM snapshots WHERE instance = ? AND account = ? AND query = ?", key
+        ).fetchone()
+        return row[0] if row else None
+
+    def count(self, key: SnapshotKey) -> int:
+        row: tuple[int] = self._conn.execute(
+            "SELECT COUNT(*) FROM accounts WHERE instance = ? AND account = ? AND query = ?", key
+        ).fetchone()
+        return row[0]
+
+    def known(self, key: SnapshotKey, ids: "Sequence[str]") -> set[str]:
+        placeholders = ", ".join("?" * len(ids))
+        rows: list[tuple[str]] = self._conn.execute(
+            "SELECT id FROM accounts WHERE instance = ? AND account = ? AND query = ? "  # noqa: S608
+            f"AND id IN ({placeholders})",
+            (*key, *ids),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def stale(self, key: SnapshotKey) -> list[str]:
+        """The IDs of accounts whose note and mutual status are older than the TTL."""
+        rows: list[tuple[str]] = self._conn.execute(
+            "SELECT id FROM accounts WHERE instance = ? AND account = ? AND query = ? "
+            "AND checked_at < ?",
+            (*key, time() - self.ttl.total_seconds()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def users(self, key: SnapshotKey) -> "Iterator[UserFields]":
+        """The fields of each account in the snapshot, in the order the server listed them."""
+        cursor = self._conn.execute(
+            "SELECT username, display_name, note, url, mutual FROM accounts "
+            "WHERE instance = ? AND account = ? AND query = ? ORDER BY rank",
+            key,
+        )
+        for username, display_name, note, url, mutual in cursor:
+            yield (username, display_name, note, url, bool(mutual))
+
+    def prepend(self, key: SnapshotKey, rows: "Sequence[tuple[str, UserFields]]") -> None:
+        """Add newly-seen accounts ahead of those already in the snapshot."""
+        with self._conn:
+            (first,) = self._conn.execute(
+                "SELECT COALESCE(MIN(rank), 0) FROM accounts "
+                "WHERE instance = ? AND account = ? AND query = ?",
+                key,
+            ).fetchone()
+            now = time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (*key, account_id, first - len(rows) + i, *fields, now)
+                    for i, (account_id, fields) in enumerate(rows)
+                ),
+            )
+
+    def update_relationships(
+        self, key: SnapshotKey, relationships: "Iterable[tuple[str, str, bool]]"
+    ) -> None:
+        """Store fresh notes and mutual statuses, given as `(id, note, mutual)`."""
+        now = time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE accounts SET note = ?, mutual = ?, checked_at = ? "
+                "WHERE instance = ? AND account = ? AND query = ? AND id = ?",
+                (
+                    (note, mutual, now, *key, account_id)
+                    for account_id, note, mutual in relationships
+                ),
+            )
+
+    @contextmanager
+    def rewrite(self, key: SnapshotKey, reported: int) -> "Generator[SnapshotWriter]":
+        """Replace a snapshot, committing only once every account has been added."""
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM accounts WHERE instance = ? AND account = ? AND query = ?", key
+            )
+            writer = SnapshotWriter(self._conn, key)
+            yield writer
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (*key, reported - writer.rows),
+            )
@@ -0,0 +1,196 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import re
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+    from requests import Response
+
+# Account IDs and the like, so that requests to the same endpoint are counted together.
+_ID = re.compile(r"/\d+(?=/|$)")
+
+
+@dataclass(slots=True)
+class Span:
+    """Something that took time: a request, a keyring lookup, a page of output."""
+
+    stage: str
+    name: str
+    thread: int
+    start: float
+    duration: float = 0.0
+    args: dict[str, object] = field(default_factory=dict[str, object])
+
+
+class StageSummary(NamedTuple):
+    stage: str
+    name: str
+    calls: int
+    seconds: float
+    longest: float
+    # Time until the response headers arrived, so what's left of `seconds` went on reading and
+    # parsing the body.
+    latency: float
+    bytes: int
+    waited: float
+
+
+class Tracer:
+    """Records what an export spent its time on, from every thread.
+
+    Spans are recorded by `span` wherever mafolex does something slow, and do nothing unless a
+    tracer is active. Requests sent through a session from `pooled_session` fill in the endpoint,
+    latency and size of the response on whichever span is open on their thread.
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._start = perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads: dict[int, str] = {}
+
+    def _stack(self) -> list[Span]:
+        stack: list[Span] | None = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, span: Span, thread: str) -> None:
+        with self._lock:
+            self.spans.append(span)
+            self._threads.setdefault(span.thread, thread)
+
+    def record(self, stage: str, name: str, start: float, **args: object) -> None:
+        """Record a span that started at the given `perf_counter` time and has just finished."""
+        thread = threading.current_thread()
+        span = Span(stage, name, thread.ident or 0, start - self._start, perf_counter() - start)
+        span.args.update(args)
+        self._add(span, thread.name)
+
+    @contextmanager
+    def span(self, stage: str, name: str, **args: object) -> "Generator[Span]":
+        """Record how long the block takes. Its name and arguments can be changed until it ends."""
+        thread = threading.current_thread()
+        start = perf_counter()
+        span = Span(stage, name, thread.ident or 0, start - self._start, args=dict(args))
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+            span.duration = perf_counter() - start
+            self._add(span, thread.name)
+
+    def response(self, response: "Response") -> None:
+        """Note a response's endpoint, latency and size on the span open on this thread."""
+        endpoint = _ID.sub("/:id", urlsplit(response.url).path)
+        latency = response.elapsed.total_seconds()
+        details: dict[str, object] = {
+            "status": response.status_code,
+            "latency": latency,
+            "bytes": len(response.content),
+        }
+        stack = self._stack()
+        if stack:
+            stack[-1].name = endpoint
+            stack[-1].args.update(details)
+        else:
+            self.record("request", endpoint, perf_counter() - latency, **details)
+
+    def summary(self) -> list[StageSummary]:
+        """Totals for each stage and endpoint, in the order they were first seen."""
+        groups: defaultdict[tuple[str, str], list[Span]] = defaultdict(list)
+        with self._lock:
+            for span in self.spans:
+                groups[span.stage, span.name].append(span)
+        return [
+            StageSummary(
+                stage,
+                name,
+                len(spans),
+                sum(span.duration for span in spans),
+                max(span.duration for span in spans),
+                sum(_number(span.args.get("latency")) for span in spans),
+                int(sum(_number(span.args.get("bytes")) for span in spans)),
+                sum(_number(span.args.get("rate_limit_wait")) for span in spans),
+            )
+            for (stage, name), spans in groups.items()
+        ]
+
+    def write_chrome_trace(self, path: "Path") -> None:
+        """Write the spans as a Chrome trace, which Perfetto or `chrome://tracing` can open."""
+        with self._lock:
+            events: list[dict[str, object]] = [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            events.extend(
+                {
+                    "name": span.name,
+                    "cat": span.stage,
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": 1,
+                    "tid": span.thread,
+                    "args": span.args,
+                }
+                for span in self.spans
+            )
+        with path.open("w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _number(value: object) -> float:
+    return value if isinstance(value, int | float) else 0
+
+
+_tracer: Tracer | None = None
+
+
+@contextmanager
+def tracing() -> "Generator[Tracer]":
+    """Trace everything mafolex does, on every thread, until the block ends."""
+    global _tracer  # noqa: PLW0603
+    previous, _tracer = _tracer, Tracer()
+    try:
+        yield _tracer
+    finally:
+        _tracer = previous
+
+
+@contextmanager
+def span(stage: str, name: str, **args: object) -> "Generator[Span | None]":
+    """Record how long the block takes, if tracing."""
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(stage, name, **args) as current:
+        yield current
+
+
+def record(stage: str, name: str, start: float, **args: object) -> None:
+    """Record something that started at the given `perf_counter` time and just finished."""
+    if _tracer is not None:
+        _tracer.record(stage, name, start, **args)
+
+
+def response_hook(response: "Response", *args: object, **kwargs: object) -> None:  # noqa: ARG001
+    """A `requests` response hook, passing responses on to the tracer, if tracing."""
+    if _tracer is not None:
+        _tracer.response(response)
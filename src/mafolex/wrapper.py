@@ -2,22 +2,60 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from importlib.metadata import version
-from typing import TYPE_CHECKING
+from functools import lru_cache
+from itertools import batched
+from math import ceil
+from queue import Full, Queue
+from threading import Event, Lock, RLock, Thread
+from typing import TYPE_CHECKING, NamedTuple, cast
 
-import keyring
 from mastodon import Mastodon as MastodonAPI
-from mastodon import MastodonError
+from mastodon import MastodonError, MastodonIllegalArgumentError
+from requests import Session
+from requests.adapters import HTTPAdapter
 
-from . import __version__
+from . import __version__, trace
+from .checkpoint import Checkpoint
+from .credentials import CredentialStore
+from .ratelimit import Priority, RateLimitScheduler
+from .raw import RawClient
+from .snapshot import SnapshotKey
 
 if TYPE_CHECKING:
-    from mastodon.return_types import Account
+    from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+    from collections.abc import Set as AbstractSet
+
+    from mastodon.return_types import Account, Relationship
     from mastodon.types_base import PaginatableList
 
+    from .snapshot import SnapshotCache, UserFields
+
+    # Fetches a page of accounts, starting after the given pagination cursor.
+    Fetch = Callable[[str | None], PaginatableList[Account]]
+
+# The number of account IDs we send in a single request to the relationships endpoint. This matches
+# the page size Mastodon uses for account lists, which the endpoint accepts without complaint.
+RELATIONSHIPS_BATCH_SIZE = 40
+
+# The page size we ask for when listing accounts. Mastodon clamps this to the largest page it's
+# willing to serve (80 at the time of writing), so asking for more than that is harmless.
+PAGE_SIZE = 80
+
+# The list each list is joined with to work out mutuals without asking the server.
+_OTHER = {"followers": "following", "following": "followers"}
+
+# How many pages may have their relationships resolved at the same time.
+ENRICHMENT_WORKERS = 4
+
+# How many connections we keep open to the instance: one for each enrichment worker, plus one for
+# following the pagination cursor.
+POOL_SIZE = ENRICHMENT_WORKERS + 1
 
-@dataclass
+
+@dataclass(slots=True)
 class User:
     username: str = field(metadata={"display": "Username"})
     display_name: str = field(metadata={"display": "Display name"})
@@ -25,13 +63,15 @@ class User:
     url: str = field(metadata={"display": "URL"})
     mutual: bool = field(metadata={"display": "Mutual"})
 
+    def as_tuple(self) -> tuple[str, str, str, str, bool]:
+        return (self.username, self.display_name, self.note, self.url, self.mutual)
+
     @staticmethod
-    def from_api(api: MastodonAPI, account: "Account") -> "User":
+    def from_api(account: "Account", relationship: "Relationship | None" = None) -> "User":
         note = ""
         mutual = False
-        if relationships := api.account_relationships(account):
-            note = relationships[0].note
-            mutual = relationships[0].following and relationships[0].followed_by
+        if relationship is not None:
+            note, mutual = _relationship_fields(relationship)
 
         return User(
             username=account.acct,
@@ -42,28 +82,430 @@ class User:
         )
 
 
+def _relationship_fields(relationship: "Relationship") -> tuple[str, bool]:
+    return relationship.note, relationship.following and relationship.followed_by
+
+
+# Set on a domain reference when the account is local to that domain, and so has no domain in its
+# username.
+_LOCAL = 1 << 31
+
+
+class UserTable:
+    """A compact, column-oriented list of users, for holding very large lists in memory.
+
+    Each username is split into the name and the domain, and each domain is only stored once. URLs
+    are only stored when they aren't the usual profile URL for the name and domain. Rows are built
+    into `User`s as they're read.
+    """
+
+    def __init__(self, users: "Iterable[User]" = ()) -> None:
+        self._names: list[str] = []
+        self._domains = array("I")
+        self._display_names: list[str] = []
+        self._notes: list[str] = []
+        self._urls: list[str | None] = []
+        self._mutual = bytearray()
+        self._domain_names: list[str] = []
+        self._domain_ids: dict[str, int] = {}
+        self.extend(users)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, index: int) -> User:
+        return User(*self._row(index))
+
+    def __setitem__(self, index: int, user: User) -> None:
+        name, domain, display_name, note, url, mutual = self._pack(user)
+        self._names[index] = name
+        self._domains[index] = domain
+        self._display_names[index] = display_name
+        self._notes[index] = note
+        self._urls[index] = url
+        self._mutual[index] = mutual
+
+    def __delitem__(self, index: int | slice) -> None:
+        del self._names[index]
+        del self._domains[index]
+        del self._display_names[index]
+        del self._notes[index]
+        del self._urls[index]
+        del self._mutual[index]
+
+    def __iter__(self) -> "Iterator[User]":
+        return (User(*row) for row in self.rows())
+
+    def insert(self, index: int, users: "Iterable[User]") -> None:
+        """Insert users before the given row."""
+        packed = [self._pack(user) for user in users]
+        if not packed:
+            return
+        names, domains, display_names, notes, urls, mutual = zip(*packed, strict=True)
+        self._names[index:index] = names
+        self._domains[index:index] = array("I", domains)
+        self._display_names[index:index] = display_names
+        self._notes[index:index] = notes
+        self._urls[index:index] = urls
+        self._mutual[index:index] = mutual
+
+    def extend(self, users: "Iterable[User]") -> None:
+        self.insert(len(self), users)
+
+    def append(self, user: User) -> None:
+        self.insert(len(self), (user,))
+
+    def rows(self) -> "Iterator[UserFields]":
+        """Every row as a tuple of fields, without building a `User` for each."""
+        hosts = self._domain_names
+        # zip() only keeps track of the types of up to five iterables.
+        name: str
+        domain: int
+        display_name: str
+        note: str
+        url: str | None
+        mutual: int
+        for name, domain, display_name, note, url, mutual in zip(
+            self._names,
+            self._domains,
+            self._display_names,
+            self._notes,
+            self._urls,
+            self._mutual,
+            strict=True,
+        ):
+            host = hosts[domain & ~_LOCAL]
+            yield (
+                name if domain & _LOCAL else f"{name}@{host}",
+                display_name,
+                note,
+                url if url is not None else f"https://{host}/@{name}",
+                mutual == 1,
+            )
+
+    def _row(self, index: int) -> "UserFields":
+        name = self._names[index]
+        domain = self._domains[index]
+        host = self._domain_names[domain & ~_LOCAL]
+        username = name if domain & _LOCAL else f"{name}@{host}"
+        url = self._urls[index]
+        if url is None:
+            url = f"https://{host}/@{name}"
+        return (
+            username,
+            self._display_names[index],
+            self._notes[index],
+            url,
+            self._mutual[index] == 1,
+        )
+
+    def _pack(self, user: User) -> tuple[str, int, str, str, str | None, int]:
+        name, at, host = user.username.partition("@")
+        local = 0
+        if not at:
+            # Local accounts don't include their domain, but their URL usually does.
+            host = user.url.removeprefix("https://").partition("/")[0]
+            local = _LOCAL
+        domain = self._domain_ids.get(host)
+        if domain is None:
+            domain = self._domain_ids[host] = len(self._domain_names)
+            self._domain_names.append(host)
+        url = None if user.url == f"https://{host}/@{name}" else user.url
+        return name, domain | local, user.display_name, user.note, url, user.mutual
+
+
+class RelationshipResolver:
+    """Looks up our relationships with many accounts, using as few requests as possible.
+
+    Given the IDs of the accounts in the other list, it doesn't look anything up at all: an account
+    is mutual exactly when it's in both lists, and only notes need the relationships endpoint.
+    """
+
+    def __init__(
+        self,
+        api: MastodonAPI,
+        scheduler: RateLimitScheduler,
+        batch_size: int = RELATIONSHIPS_BATCH_SIZE,
+        cancelled: Event | None = None,
+        others: "AbstractSet[str] | None" = None,
+    ) -> None:
+        self.api = api
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+        self.cancelled = cancelled
+        self.others = others
+        self.requests = 0
+        self.lookups = 0
+
+    @property
+    def requests_saved(self) -> int:
+        """How many requests we avoided compared to looking up each account on its own."""
+        return self.lookups - self.requests
+
+    def lookup(self, ids: "Sequence[str]") -> "dict[str, Relationship]":
+        relationships: dict[str, Relationship] = {}
+        for chunk in batched(ids, self.batch_size, strict=False):
+            with self.scheduler.request(Priority.ENRICHMENT, self.api, self.cancelled):
+                response = self.api.account_relationships(list(chunk))
+            for relationship in response:
+                relationships[str(relationship.id)] = relationship
+            self.requests += 1
+            self.lookups += len(chunk)
+        return relationships
+
+    def resolve(self, accounts: "Sequence[Account]") -> list[tuple[str, User]]:
+        """Build a user for each account, paired with its ID."""
+        ids = [str(account.id) for account in accounts]
+        if self.others is not None:
+            self.lookups += len(ids)
+            return [
+                (account_id, User(a.acct, a.display_name, "", a.url, account_id in self.others))
+                for account_id, a in zip(ids, accounts, strict=True)
+            ]
+        relationships = self.lookup(ids)
+        return [
+            (account_id, User.from_api(account, relationships.get(account_id)))
+            for account_id, account in zip(ids, accounts, strict=True)
+        ]
+
+
+def _next_cursor(page: "PaginatableList[Account]") -> str | None:
+    # Mastodon.py keeps the parameters for the next page on the page itself.
+    pagination: dict[str, object] | None = getattr(page, "_pagination_next", None)
+    if pagination is None or "max_id" not in pagination:
+        return None
+    return str(pagination["max_id"])
+
+
+def _pages(
+    api: MastodonAPI,
+    scheduler: RateLimitScheduler,
+    fetch: "Fetch",
+    cursor: str | None = None,
+    cancelled: Event | None = None,
+) -> "Iterator[PaginatableList[Account]]":
+    with scheduler.request(Priority.PAGINATION, api, cancelled):
+        page = fetch(cursor)
+    while page:
+        yield page
+        with scheduler.request(Priority.PAGINATION, api, cancelled):
+            page = api.fetch_next(page)
+
+
+class _PendingPage(NamedTuple):
+    resolver: RelationshipResolver
+    future: "Future[list[tuple[str, User]]]"
+    # The cursor for the page after this one.
+    cursor: str | None
+
+
+class _Pipeline:
+    """Follows the pagination cursor while relationships are resolved for pages already fetched.
+
+    One thread walks the pages, handing each to a bounded pool that resolves its relationships. The
+    consumer receives the finished pages in their original order, so the time taken is roughly the
+    longer of pagination and enrichment rather than their sum.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api: MastodonAPI,
+        scheduler: RateLimitScheduler,
+        fetch: "Fetch",
+        cursor: str | None = None,
+        *,
+        checkpoint: Checkpoint | None = None,
+        others: "AbstractSet[str] | None" = None,
+    ) -> None:
+        self.api = api
+        self.scheduler = scheduler
+        self.fetch = fetch
+        self.cursor = cursor
+        self.checkpoint = checkpoint
+        self.others = others
+        self.requests_saved = 0
+        self._pending: Queue[_PendingPage | None] = Queue(maxsize=ENRICHMENT_WORKERS)
+        self._stopped = Event()
+
+    def _put(self, item: "_PendingPage | None") -> None:
+        while not self._stopped.is_set():
+            try:
+                self._pending.put(item, timeout=0.1)
+            except Full:
+                continue
+            else:
+                return
+
+    def _paginate(self, pool: ThreadPoolExecutor) -> None:
+        try:
+            for page in _pages(self.api, self.scheduler, self.fetch, self.cursor, self._stopped):
+                if self._stopped.is_set():
+                    return
+                resolver = RelationshipResolver(
+                    self.api, self.scheduler, cancelled=self._stopped, others=self.others
+                )
+                future = pool.submit(resolver.resolve, page)
+                self._put(_PendingPage(resolver, future, _next_cursor(page)))
+        except Exception as e:  # noqa: BLE001 - re-raised by the consumer
+            failed: Future[list[tuple[str, User]]] = Future()
+            failed.set_exception(e)
+            self._put(_PendingPage(RelationshipResolver(self.api, self.scheduler), failed, None))
+        finally:
+            self._put(None)
+
+    def __iter__(self) -> "Iterator[tuple[str, User]]":
+        with ThreadPoolExecutor(ENRICHMENT_WORKERS, thread_name_prefix="mafolex-enrich") as pool:
+            producer = Thread(target=self._paginate, args=(pool,), daemon=True)
+            producer.start()
+            try:
+                while (item := self._pending.get()) is not None:
+                    rows = item.future.result()
+                    if self.checkpoint is not None:
+                        self.checkpoint.save(
+                            item.cursor,
+                            [(account_id, user.as_tuple()) for account_id, user in rows],
+                        )
+                    yield from rows
+                    self.requests_saved += item.resolver.requests_saved
+                if self.checkpoint is not None:
+                    self.checkpoint.clear()
+            finally:
+                # Anything still waiting for budget gives up now, rather than holding us up until
+                # the rate limit resets.
+                self.scheduler.cancel(self._stopped)
+                pool.shutdown(wait=False, cancel_futures=True)
+                producer.join()
+
+
+@lru_cache(maxsize=1)
+def user_agent() -> str:
+    # Looking up the installed version reads package metadata from disk, so it waits until we're
+    # about to talk to a server.
+    from importlib.metadata import version  # noqa: PLC0415
+
+    return f"mafolex {__version__}, using mastodonpy {version('mastodon.py')}"
+
+
+def pooled_session(connections: int = POOL_SIZE) -> Session:
+    """A session keeping up to this many keep-alive connections open to each host."""
+    session = Session()
+    session.hooks["response"].append(trace.response_hook)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class Mastodon:
     _name = "mafolex"
     _scopes: list[str]
-    _user_agent = f"mafolex {__version__}, using mastodonpy {version('mastodon.py')}"
 
-    def __init__(self) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        cache: "SnapshotCache | None" = None,
+        resumable: bool = False,
+        connections: int = POOL_SIZE,
+        *,
+        instance_domain: str | None = None,
+        access_token: str | None = None,
+        session: Session | None = None,
+        raw: bool = False,
+        notes: bool = True,
+    ) -> None:
+        """Set up the wrapper, logged in as whoever the keyring says unless told otherwise.
+
+        Args:
+            cache: Where to keep snapshots, to fetch only what changed since the last time.
+            resumable: Whether to save progress after every page, so an export can be resumed.
+            connections: How many connections to the instance to keep open at once.
+            instance_domain: The instance to use instead of the one saved in the keyring.
+            access_token: The token to log in with instead of the one saved in the keyring.
+            session: A session to share with other wrappers talking to the same instance, rather
+                than opening a pool of connections of our own.
+            raw: Whether to read account lists and relationships straight from the JSON, rather
+                than through mastodon.py's typed objects, which is much faster on large lists.
+            notes: Whether to look up the note on each account. Without notes, mutuals are worked
+                out by joining followers and following, and the relationships endpoint isn't used.
+        """
         self._scopes = ["read:accounts", "read:follows"]
+        self.cache = cache
+        self.resumable = resumable
+        self.raw = raw
+        self.notes = notes
+        self.requests_saved = 0
+        self._saved_lock = Lock()
+        # Guards the lazily-created client and account, which may be wanted by several threads.
+        self._lock = RLock()
+        self.credentials = CredentialStore(instance_domain, access_token)
+        self.scheduler = RateLimitScheduler()
+
+        # One session for the lifetime of the wrapper, so that every request can reuse a pooled
+        # keep-alive connection instead of opening a new one.
+        self._session = session or pooled_session(connections)
+
+        self._api: MastodonAPI | None = None
+        self._raw: RawClient | None = None
+        self._account: Account | None = None
+
+    def _reset(self) -> None:
+        """Forget the clients and account, after the instance or credentials have changed."""
+        self._api = None
+        self._raw = None
+        self._account = None
+
+    @property
+    def _client(self) -> MastodonAPI:
+        with self._lock:
+            if self._api is None:
+                self._api = MastodonAPI(
+                    api_base_url=self.instance_domain,
+                    client_id=self._client_id,
+                    client_secret=self._client_secret,
+                    access_token=self._access_token,
+                    user_agent=user_agent(),
+                    session=self._session,
+                )
+            return self._api
+
+    @property
+    def _lists(self) -> MastodonAPI:
+        """The client that pages through account lists and looks up relationships."""
+        if not self.raw:
+            return self._client
+        with self._lock:
+            if self._raw is None:
+                instance = self.instance_domain
+                if instance is None:
+                    msg = "Can't fetch accounts without an instance"
+                    raise MastodonIllegalArgumentError(msg)
+                self._raw = RawClient(
+                    instance, self._access_token, self._session, user_agent=user_agent()
+                )
+            # It has the same methods as the parts of mastodon.py's client that we use it for.
+            return cast("MastodonAPI", self._raw)
+
+    def _current_account(self) -> "Account":
+        with self._lock:
+            if self._account is None:
+                with self.scheduler.request(Priority.PAGINATION, self._client):
+                    self._account = self._client.account_verify_credentials()
+            return self._account
 
     @property
     def instance_domain(self) -> str | None:
-        c = keyring.get_credential("mafolex/instance-domain", None)
-        return c.password if c else None
+        return self.credentials.instance_domain
 
     @instance_domain.setter
     def instance_domain(self, v: str) -> None:
-        keyring.set_password("mafolex/instance-domain", "", v)
+        self.credentials.instance_domain = v
+        self._reset()
         if not (self._client_id and self._client_secret):
             self._client_id, self._client_secret = MastodonAPI.create_app(
                 self._name,
                 api_base_url=self.instance_domain,
                 scopes=self._scopes,
-                user_agent=self._user_agent,
+                session=self._session,
+                user_agent=user_agent(),
             )
 
     @property
@@ -81,82 +523,224 @@ class Mastodon:
         return False
 
     def get_auth_url(self) -> str:
-        return MastodonAPI(
-            api_base_url=self.instance_domain,
-            user_agent=self._user_agent,
-            client_id=self._client_id,
-            client_secret=self._client_secret,
-        ).auth_request_url(scopes=self._scopes)
-
-    def _keyring_lookup(self, key: str) -> None | str:
-        if not self.instance_domain:
-            return None
-        c = keyring.get_credential(f"mafolex/{key}/{self.instance_domain}", None)
-        return c.password if c else None
-
-    def _keyring_set(self, key: str, v: str) -> None:
-        if not self.instance_domain:
-            msg = "Missing instance domain. This shouldn't happen!"
-            raise RuntimeError(msg)
-        keyring.set_password(f"mafolex/{key}/{self.instance_domain}", "", v)
+        return self._client.auth_request_url(scopes=self._scopes)
 
     @property
     def _client_id(self) -> str | None:
-        return self._keyring_lookup("client-id")
+        return self.credentials.get("client-id")
 
     @_client_id.setter
     def _client_id(self, v: str) -> None:
-        self._keyring_set("client-id", v)
+        self.credentials.set("client-id", v)
 
     @property
     def _client_secret(self) -> str | None:
-        return self._keyring_lookup("client-secret")
+        return self.credentials.get("client-secret")
 
     @_client_secret.setter
     def _client_secret(self, v: str) -> None:
-        self._keyring_set("client-secret", v)
+        self.credentials.set("client-secret", v)
 
     @property
     def _access_token(self) -> str | None:
-        return self._keyring_lookup("access-token")
+        return self.credentials.get("access-token")
 
     @_access_token.setter
     def _access_token(self, v: str) -> None:
-        self._keyring_set("access-token", v)
+        self.credentials.set("access-token", v)
 
     def auth(self, code: str) -> None:
-        self._access_token = MastodonAPI(
-            api_base_url=self.instance_domain,
-            client_id=self._client_id,
-            client_secret=self._client_secret,
-        ).log_in(
+        self._access_token = self._client.log_in(
             code=code,
             scopes=self._scopes,
         )
+        self._reset()
 
     def get_current_user(self) -> str:
-        user = MastodonAPI(
-            api_base_url=self.instance_domain,
-            access_token=self._access_token,
-        ).account_verify_credentials()
-        return f"@{user.username}@{self.instance_domain}"
-
-    def get_followers(self) -> list[User]:
-        api = MastodonAPI(
-            api_base_url=self.instance_domain,
-            access_token=self._access_token,
-        )
-        followers_response: PaginatableList[Account] = api.fetch_remaining(
-            api.account_followers(api.me())
-        )
-        return [User.from_api(api, account) for account in followers_response]
+        return f"@{self._current_account().username}@{self.instance_domain}"
+
+    def _key(self, query: str) -> SnapshotKey:
+        return SnapshotKey(self.instance_domain or "", str(self._current_account().id), query)
 
-    def get_following(self) -> list[User]:
-        api = MastodonAPI(
-            api_base_url=self.instance_domain,
-            access_token=self._access_token,
+    def _stream(
+        self, query: str, fetch: "Fetch", others: "AbstractSet[str] | None" = None
+    ) -> "Iterator[tuple[str, User]]":
+        expected = self.reported_count(query)
+        cursor = None
+        checkpoint = None
+        if self.resumable:
+            checkpoint = Checkpoint(self._key(query))
+            if state := checkpoint.load():
+                for account_id, fields in checkpoint.rows(state):
+                    expected -= 1
+                    yield account_id, User(*fields)
+                if state.cursor is None:
+                    checkpoint.clear()
+                    return
+                cursor = state.cursor
+            else:
+                checkpoint.start()
+
+        self.scheduler.expect(Priority.PAGINATION, ceil(expected / PAGE_SIZE))
+        if others is None:
+            self.scheduler.expect(Priority.ENRICHMENT, ceil(expected / RELATIONSHIPS_BATCH_SIZE))
+        pipeline = _Pipeline(
+            self._lists, self.scheduler, fetch, cursor, checkpoint=checkpoint, others=others
         )
-        followers_response: PaginatableList[Account] = api.fetch_remaining(
-            api.account_following(api.me())
+        try:
+            yield from pipeline
+        finally:
+            self._add_saved(pipeline.requests_saved)
+
+    def _add_saved(self, requests: int) -> None:
+        with self._saved_lock:
+            self.requests_saved += requests
+
+    def _resolve(
+        self, accounts: "Sequence[Account]", others: "AbstractSet[str] | None"
+    ) -> list[tuple[str, User]]:
+        resolver = RelationshipResolver(self._lists, self.scheduler, others=others)
+        users = resolver.resolve(accounts)
+        self._add_saved(resolver.requests_saved)
+        return users
+
+    def _fetch_new(
+        self,
+        cache: "SnapshotCache",
+        key: SnapshotKey,
+        fetch: "Fetch",
+        reported: int,
+        others: "AbstractSet[str] | None",
+    ) -> list[tuple[str, User]] | None:
+        """Fetch the accounts that were added since the snapshot was taken.
+
+        Lists are ordered newest first, so we can stop as soon as we see an account we already
+        know. Returns `None` if the snapshot can't be brought up to date that way, because it
+        doesn't exist or because some accounts have gone missing since.
+        """
+        hidden = cache.hidden(key)
+        if hidden is None:
+            return None
+
+        new: list[tuple[str, User]] = []
+        for page in _pages(self._lists, self.scheduler, fetch):
+            ids = [str(account.id) for account in page]
+            if known := cache.known(key, ids):
+                # Anything after the first account we know about is already in the snapshot.
+                first_known = next(i for i, account_id in enumerate(ids) if account_id in known)
+                new.extend(self._resolve(page[:first_known], others))
+                break
+            new.extend(self._resolve(page, others))
+
+        if len(new) + cache.count(key) + hidden != reported:
+            return None
+        return new
+
+    def _revalidate(
+        self, cache: "SnapshotCache", key: SnapshotKey, others: "AbstractSet[str] | None"
+    ) -> None:
+        if others is not None:
+            cache.update_relationships(
+                key, ((account_id, "", account_id in others) for account_id in cache.stale(key))
+            )
+            return
+        resolver = RelationshipResolver(self._lists, self.scheduler)
+        relationships = resolver.lookup(cache.stale(key))
+        self._add_saved(resolver.requests_saved)
+        cache.update_relationships(
+            key,
+            (
+                (account_id, *_relationship_fields(relationship))
+                for account_id, relationship in relationships.items()
+            ),
         )
-        return [User.from_api(api, account) for account in followers_response]
+
+    def _sync(
+        self,
+        cache: "SnapshotCache",
+        query: str,
+        fetch: "Fetch",
+        others: "AbstractSet[str] | None",
+    ) -> "Generator[User]":
+        key = self._key(query)
+        reported = self.reported_count(query)
+
+        new = self._fetch_new(cache, key, fetch, reported, others)
+        if new is None:
+            with cache.rewrite(key, reported) as snapshot:
+                for account_id, user in self._stream(query, fetch, others):
+                    snapshot.add(account_id, user.as_tuple())
+                    yield user
+            return
+
+        cache.prepend(key, [(account_id, user.as_tuple()) for account_id, user in new])
+        self._revalidate(cache, key, others)
+        for fields in cache.users(key):
+            yield User(*fields)
+
+    def snapshot(self, query: str) -> "Iterator[UserFields]":
+        """The followers or following in the local snapshot, as they were at the last sync.
+
+        Raises:
+            LookupError: There's no cache, or no snapshot in it of this account's list.
+        """
+        key = self._key(query)
+        if self.cache is None or self.cache.hidden(key) is None:
+            msg = f"There's no snapshot of {query} for {self.get_current_user()}"
+            raise LookupError(msg)
+        return self.cache.users(key)
+
+    def reported_count(self, query: str) -> int:
+        """How many followers or following the server says the account has."""
+        account = self._current_account()
+        return account.followers_count if query == "followers" else account.following_count
+
+    def _fetcher(self, query: str) -> "Fetch":
+        api = self._lists
+        list_accounts = api.account_followers if query == "followers" else api.account_following
+        return lambda cursor: list_accounts(self._current_account(), max_id=cursor, limit=PAGE_SIZE)
+
+    def account_ids(self, query: str) -> set[str]:
+        """The IDs of every account in the list, which only takes a request for each page."""
+        self.scheduler.expect(Priority.PAGINATION, ceil(self.reported_count(query) / PAGE_SIZE))
+        pages = _pages(self._lists, self.scheduler, self._fetcher(query))
+        return {str(account.id) for page in pages for account in page}
+
+    def _iter(self, query: str) -> "Generator[User]":
+        fetch = self._fetcher(query)
+        # Paging through the other list takes half as many requests as looking up relationships.
+        others = None if self.notes else self.account_ids(_OTHER[query])
+        if self.cache is not None:
+            yield from self._sync(self.cache, query, fetch, others)
+        else:
+            yield from (user for _, user in self._stream(query, fetch, others))
+
+    def iter_followers(self) -> "Generator[User]":
+        return self._iter("followers")
+
+    def iter_following(self) -> "Generator[User]":
+        return self._iter("following")
+
+    def fetch_page(
+        self, query: str, cursor: str | None = None
+    ) -> "tuple[list[Account], str | None]":
+        """Fetch a single page of followers or following, along with the cursor for the next."""
+        with self.scheduler.request(Priority.PAGINATION, self._lists):
+            page = self._fetcher(query)(cursor)
+        return list(page), _next_cursor(page)
+
+    def resolve(
+        self, accounts: "Sequence[Account]", others: "AbstractSet[str] | None" = None
+    ) -> list[User]:
+        """Build users for the given accounts, looking up their relationships in batches.
+
+        Given the IDs of the accounts in the other list, mutuals come from those instead, and
+        nothing is looked up.
+        """
+        return [user for _, user in self._resolve(accounts, others)]
+
+    def get_followers(self) -> UserTable:
+        return UserTable(self.iter_followers())
+
+    def get_following(self) -> UserTable:
+        return UserTable(self.iter_following())
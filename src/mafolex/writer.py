@@ -2,28 +2,214 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import csv
-from dataclasses import asdict, fields
-from typing import TYPE_CHECKING
+import gzip
+import sqlite3
+from contextlib import closing
+from dataclasses import fields
+from importlib import import_module
+from itertools import batched
+from json.encoder import encode_basestring
+from typing import TYPE_CHECKING, cast
 
-from .wrapper import User
+from . import trace
+from .wrapper import User, UserTable
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
     from pathlib import Path
+    from types import ModuleType
     from typing import IO
 
+    from .diff import Change
+    from .snapshot import UserFields
 
-def write(followers: list[User], f: "IO[str]", header: bool = True) -> None:
-    writer = csv.DictWriter(
-        f,
-        quoting=csv.QUOTE_NOTNULL,
-        fieldnames=[field.name for field in fields(User)],
-    )
+FIELDS = tuple(field.name for field in fields(User))
+
+# How many rows we format before handing them to the file in a single write.
+CHUNK_SIZE = 4096
+
+# Formats we can read and write, by file extension. Anything else is taken to be CSV.
+FORMATS = (".csv", ".jsonl", ".sqlite", ".db")
+COMPRESSIONS = (".gz", ".zst")
+SQLITE_FORMATS = (".sqlite", ".db")
+
+# Every field is quoted, exactly as `csv.QUOTE_NOTNULL` does it, but without the per-field overhead
+# of the csv module.
+_CSV_HEADER = ",".join(f'"{name}"' for name in FIELDS) + "\r\n"
+_CSV_ROW = ",".join(['"%s"'] * len(FIELDS)) + "\r\n"
+_CHANGE_HEADER = '"change",' + _CSV_HEADER
+_CHANGE_ROW = '"%s",' + _CSV_ROW
+_JSONL_ROW = "{" + ", ".join(f'"{name}": %s' for name in FIELDS) + "}\n"
+
+
+def _rows(followers: "Iterable[User] | UserTable") -> "Iterable[UserFields]":
+    if isinstance(followers, UserTable):
+        return followers.rows()
+    return (follower.as_tuple() for follower in followers)
+
+
+def write(
+    followers: "Iterable[User] | UserTable",
+    f: "IO[str]",
+    header: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Write users as CSV.
+
+    Rows are written `chunk_size` at a time, so lower it to see them sooner when they're trickling
+    in from the server.
+    """
+    if header:
+        f.write(_CSV_HEADER)
+    for chunk in batched(_rows(followers), chunk_size, strict=False):
+        with trace.span("output", "csv", rows=len(chunk)):
+            f.write(
+                "".join(
+                    _CSV_ROW
+                    % (
+                        username.replace('"', '""'),
+                        display_name.replace('"', '""'),
+                        note.replace('"', '""'),
+                        url.replace('"', '""'),
+                        mutual,
+                    )
+                    for username, display_name, note, url, mutual in chunk
+                )
+            )
+
+
+def write_jsonl(
+    followers: "Iterable[User] | UserTable",
+    f: "IO[str]",
+    header: bool = True,  # noqa: ARG001
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Write users as JSON Lines, one object per user. There's no header line."""
+    for chunk in batched(_rows(followers), chunk_size, strict=False):
+        with trace.span("output", "jsonl", rows=len(chunk)):
+            f.write(
+                "".join(
+                    _JSONL_ROW
+                    % (
+                        encode_basestring(username),
+                        encode_basestring(display_name),
+                        encode_basestring(note),
+                        encode_basestring(url),
+                        "true" if mutual else "false",
+                    )
+                    for username, display_name, note, url, mutual in chunk
+                )
+            )
+
+
+def write_sqlite(followers: "Iterable[User] | UserTable", path: "Path") -> None:
+    """Write users to an `accounts` table in a SQLite database, replacing any that's there."""
+    with closing(sqlite3.connect(path)) as db, db:
+        db.execute("DROP TABLE IF EXISTS accounts")
+        db.execute(
+            "CREATE TABLE accounts (username TEXT, display_name TEXT, note TEXT, url TEXT, "
+            "mutual INTEGER)"
+        )
+        for chunk in batched(_rows(followers), CHUNK_SIZE, strict=False):
+            with trace.span("output", "sqlite", rows=len(chunk)):
+                db.executemany("INSERT INTO accounts VALUES (?, ?, ?, ?, ?)", chunk)
+
+
+def write_changes(
+    changes: "Iterable[Change]", f: "IO[str]", header: bool = True, chunk_size: int = CHUNK_SIZE
+) -> None:
+    """Write the differences between two lists as CSV, with what changed in the first column.
+
+    Changed accounts are written as they are now.
+    """
     if header:
-        writer.writeheader()
-    writer.writerows([asdict(follower) for follower in followers])
+        f.write(_CHANGE_HEADER)
+    for chunk in batched(changes, chunk_size, strict=False):
+        with trace.span("output", "changes", rows=len(chunk)):
+            f.write(
+                "".join(
+                    _CHANGE_ROW
+                    % (
+                        kind,
+                        username.replace('"', '""'),
+                        display_name.replace('"', '""'),
+                        note.replace('"', '""'),
+                        url.replace('"', '""'),
+                        mutual,
+                    )
+                    for kind, (username, display_name, note, url, mutual), _ in chunk
+                )
+            )
+
+
+def zstd() -> "ModuleType | None":
+    """The zstd module, or `None` if it isn't available.
+
+    It's part of the standard library from Python 3.14. Before that, it comes from the
+    `backports.zstd` package, which `mafolex[zstd]` installs.
+    """
+    for name in ("compression.zstd", "backports.zstd"):
+        try:
+            return import_module(name)
+        except ImportError:
+            pass
+    return None
+
+
+def _open(path: "Path", compression: str | None) -> "IO[str]":
+    match compression:
+        case ".gz":
+            # The zlib default, which is much faster than gzip's and barely any bigger.
+            return gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="")
+        case ".zst":
+            return cast("ModuleType", zstd()).open(path, "wt", encoding="utf-8", newline="")
+        case _:
+            return path.open("w+", newline="", encoding="utf-8")
+
+
+def file_format(path: "Path") -> tuple[str, str | None]:
+    """The format and compression of a file, going by its extensions.
 
+    Raises:
+        ValueError: The path's extensions ask for a format we can't read or write.
+    """
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    compression = suffixes.pop() if suffixes and suffixes[-1] in COMPRESSIONS else None
+    extension = suffixes[-1] if suffixes and suffixes[-1] in FORMATS else ".csv"
+    if compression is not None and extension in SQLITE_FORMATS:
+        msg = "SQLite databases can't be compressed"
+        raise ValueError(msg)
+    if compression == ".zst" and zstd() is None:
+        msg = ".zst files need Python 3.14 or newer, or mafolex[zstd] installed"
+        raise ValueError(msg)
+    return extension, compression
 
-def write_file(followers: list[User], path: "Path", header: bool = True) -> None:
-    with path.open("w+", newline="", encoding="utf-8") as f:
-        write(followers, f, header)
+
+def check_path(path: "Path") -> None:
+    """Make sure we can write to the given path, before going to the trouble of fetching anything.
+
+    Raises:
+        ValueError: The path's extensions ask for a format we can't write.
+    """
+    file_format(path)
+
+
+def write_file(followers: "Iterable[User] | UserTable", path: "Path", header: bool = True) -> None:
+    """Write users to a file, in the format its extension asks for.
+
+    That's `.csv`, `.jsonl`, or `.sqlite` or `.db`, and the first two can be compressed by adding
+    `.gz` or `.zst`. Files with any other extension get CSV.
+
+    Raises:
+        ValueError: The path's extensions ask for a format we can't write.
+    """
+    extension, compression = file_format(path)
+    if extension in SQLITE_FORMATS:
+        write_sqlite(followers, path)
+        return
+
+    writer: Callable[[Iterable[User] | UserTable, IO[str], bool], None] = (
+        write_jsonl if extension == ".jsonl" else write
+    )
+    with _open(path, compression) as f:
+        writer(followers, f, header)